@@ -0,0 +1,91 @@
+"""Read configs straight out of backup archives.
+
+Supports `.tar`, `.tar.gz`/`.tgz`, `.zip`, single `.cfg.gz` files and, when
+the `zstandard` package is installed, `.tar.zst` and `.cfg.zst`. Members are
+streamed and decoded in memory; nothing is extracted to disk. Tar archives
+are read sequentially (`r|*`), so a large archive is never seeked or
+buffered whole.
+"""
+import os
+import gzip
+import tarfile
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config_prep import DEFAULT_CONFIG_DIR, resolve_config_os
+
+try:
+    import zstandard
+except Exception:
+    zstandard = None
+
+CONFIG_SUFFIX = ".cfg"
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.zst", ".zip", ".cfg.gz", ".cfg.zst")
+
+def is_archive(path: str) -> bool:
+    return path.lower().endswith(ARCHIVE_SUFFIXES)
+
+def list_config_inputs(config: Optional[str] = None, config_dir: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """(plain .cfg files, archives) for --config or --config-dir."""
+    if config:
+        return ([], [config]) if is_archive(config) else ([config], [])
+    cfg_dir = config_dir or DEFAULT_CONFIG_DIR
+    names = sorted(os.listdir(cfg_dir))
+    files = [os.path.join(cfg_dir, n) for n in names if n.endswith(CONFIG_SUFFIX)]
+    archives = [os.path.join(cfg_dir, n) for n in names if is_archive(n)]
+    if not files and not archives:
+        raise SystemExit(f"No .cfg files or config archives found in {cfg_dir}")
+    return files, archives
+
+def decode_config(data: bytes) -> str:
+    # Same decoding as read_config, so byte spans stay relative to the member
+    return data.decode("utf-8", "surrogateescape")
+
+def zstd_reader(fileobj):
+    if zstandard is None:
+        raise RuntimeError("zstd archives need the zstandard package. Install zstandard.")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+def iter_tar(fileobj=None, path: Optional[str] = None) -> Iterator[Tuple[str, bytes]]:
+    mode = "r|" if fileobj is not None else "r|*"
+    with tarfile.open(name=path, fileobj=fileobj, mode=mode) as tf:
+        for member in tf:
+            if member.isfile() and member.name.endswith(CONFIG_SUFFIX):
+                yield member.name, tf.extractfile(member).read()
+
+def iter_members(path: str) -> Iterator[Tuple[str, bytes]]:
+    """(member name, raw bytes) for every .cfg in an archive."""
+    lower = path.lower()
+    base = os.path.basename(path)
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and info.filename.endswith(CONFIG_SUFFIX):
+                    yield info.filename, zf.read(info)
+    elif lower.endswith(".cfg.gz"):
+        with gzip.open(path, "rb") as f:
+            yield base[:-len(".gz")], f.read()
+    elif lower.endswith(".cfg.zst"):
+        with open(path, "rb") as raw, zstd_reader(raw) as f:
+            yield base[:-len(".zst")], f.read()
+    elif lower.endswith(".tar.zst"):
+        with open(path, "rb") as raw, zstd_reader(raw) as f:
+            yield from iter_tar(fileobj=f)
+    else:
+        yield from iter_tar(path=path)
+
+def prepare_archive(path: str, os_type: Optional[str] = None, os_map: Optional[Dict[str, str]] = None,
+                    detect_os: bool = False) -> Iterator[Dict[str, Any]]:
+    """prepare_configs for one archive: yields one item per member, with
+    os_map resolved against the member path, its file name or the device."""
+    auto_detect = detect_os or (os_type is None and os_map is None)
+    for member, data in iter_members(path):
+        filename = os.path.basename(member)
+        device = os.path.splitext(filename)[0]
+        text = decode_config(data)
+        yield {
+            "device": device,
+            "os_type": resolve_config_os(device, filename, text, os_type, os_map, auto_detect, aliases=(member,)),
+            "text": text,
+            "path": f"{path}::{member}",
+        }
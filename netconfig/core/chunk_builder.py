@@ -1,14 +1,14 @@
 import os
 import re
+import sys
 import json
-from typing import List, Dict, Any, Optional
+import hashlib
+from bisect import bisect_right
+from typing import List, Optional
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-
-SIZE_SPLITTER = RecursiveCharacterTextSplitter(
-    chunk_size=800,
-    chunk_overlap=100
-)
+from .chunk_sizing import CharSizing, DEFAULT_SIZING
+from .chunk_record import ChunkRecord, records_to_dicts
+from .xref import build_xref, write_xref
 
 def build_section_regex(patterns):
     return re.compile("|".join(patterns), re.IGNORECASE)
@@ -55,49 +55,182 @@ def is_section_start(line: str, idx: int, lines, section_start_regex, comment_pr
         return True
     return False
 
-def emit_global(device, lines, splitter):
-    content = "\n".join(lines)
-    if len(content) > 1200:
-        return [make_global_chunk(device, sub) for sub in splitter.split_text(content)]
-    return [make_global_chunk(device, content)]
+class SourceLines:
+    """Config lines plus the byte offset of each line in the source file."""
+
+    def __init__(self, text: str):
+        self.lines = text.splitlines()
+        self.starts = []
+        offset = 0
+        ascii_only = text.isascii()
+        for raw in text.splitlines(keepends=True):
+            self.starts.append(offset)
+            offset += len(raw) if ascii_only else byte_len(raw)
+
+def byte_len(text: str) -> int:
+    return len(text) if text.isascii() else len(text.encode("utf-8", "surrogateescape"))
+
+def set_span(chunk, source, first, first_col, last, last_col):
+    """Record 1-based inclusive line span and [byte_start, byte_end) in the source."""
+    chunk.line_start = first + 1
+    chunk.line_end = last + 1
+    chunk.byte_start = source.starts[first] + byte_len(source.lines[first][:first_col])
+    chunk.byte_end = source.starts[last] + byte_len(source.lines[last][:last_col])
+    return chunk
 
-def emit_section(device, header, lines, splitter):
+def emit_chunks(make, idxs, source, sizing):
+    lines = [source.lines[i] for i in idxs]
     content = "\n".join(lines)
-    if len(content) > 1200:
-        return [
-            make_explicit_chunk(device, header, sub)
-            for sub in splitter.split_text(content)
-        ]
-    return [make_explicit_chunk(device, header, content)]
+    if sizing.length(content) <= sizing.max_len:
+        return [set_span(make(content), source, idxs[0], 0, idxs[-1], len(lines[-1]))]
+
+    # Map each split piece back to its source lines via its offset in content
+    line_pos, pos = [], 0
+    for line in lines:
+        line_pos.append(pos)
+        pos += len(line) + 1
+    chunks, search_from = [], 0
+    for sub in sizing.splitter.split_text(content):
+        start = content.find(sub, search_from)
+        if start < 0:
+            start = content.find(sub)
+        end = start + len(sub)
+        first = bisect_right(line_pos, start) - 1
+        last = bisect_right(line_pos, end - 1) - 1
+        chunks.append(set_span(
+            make(sub), source,
+            idxs[first], start - line_pos[first],
+            idxs[last], end - line_pos[last]
+        ))
+        search_from = start + 1
+    return chunks
+
+def emit_global(device, idxs, source, sizing):
+    return emit_chunks(lambda content: make_global_chunk(device, content), idxs, source, sizing)
+
+def emit_section(device, header, idxs, source, sizing):
+    make = lambda content: make_explicit_chunk(device, header, content)
+    if not getattr(sizing, "hierarchical", False):
+        return emit_chunks(make, idxs, source, sizing)
+    return emit_hierarchy(make, header, idxs, source, sizing, None, 0)
+
+PATH_SEP = " > "
+
+def indent_of(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+def block_segments(body, lines):
+    """Contiguous segments of a block body: ("block", idxs) for a child line
+    with deeper-indented lines under it, ("lines", idxs) for runs of leaf lines.
+    `exit...` lines (IOS exit-address-family) stay with the block they close."""
+    units = []
+    base = indent_of(lines[body[0]]) if body else 0
+    for i in body:
+        line = lines[i]
+        if indent_of(line) > base and units:
+            units[-1].append(i)
+        elif units and len(units[-1]) > 1 and line.strip().startswith("exit"):
+            units[-1].append(i)
+        else:
+            units.append([i])
+
+    segments = []
+    for unit in units:
+        if len(unit) > 1:
+            segments.append(("block", unit))
+        elif segments and segments[-1][0] == "lines":
+            segments[-1][1].append(unit[0])
+        else:
+            segments.append(("lines", list(unit)))
+    return segments
+
+def emit_hierarchy(make, path, idxs, source, sizing, parent, depth):
+    """Split an oversized block (idxs[0] is its header line) along indentation.
+
+    Child blocks and leaf lines are packed in source order into chunks of at
+    most `max_len`; the first chunk holds the header and is the parent of the
+    others. A chunk holding exactly one child block gets that block's header
+    appended to `section_path`; child blocks that are still too large recurse.
+    Chunks stay contiguous in the source, so spans and views remain exact.
+    """
+    lines = source.lines
+    length = lambda seg: sizing.length("\n".join(lines[i] for i in seg))
+
+    def tag(chunks, chunk_path, chunk_parent, chunk_depth):
+        for c in chunks:
+            c.section_path = sys.intern(chunk_path)
+            c.parent_id = chunk_parent
+            c.depth = chunk_depth
+        return chunks
+
+    if len(idxs) == 1 or length(idxs[:1]) > sizing.max_len:
+        return tag(emit_chunks(make, idxs, source, sizing), path, parent, depth)
+
+    segments = []
+    for kind, seg in block_segments(idxs[1:], lines):
+        if kind == "lines" and length(seg) > sizing.max_len:
+            # Oversized leaf runs are packed line by line
+            segments.extend(("lines", [i]) for i in seg)
+        else:
+            segments.append((kind, seg))
+
+    out = []
+    head = None
+    pack, pack_kinds, pack_len = [idxs[0]], ["header"], length(idxs[:1])
+
+    def flush():
+        nonlocal head
+        if not pack:
+            return
+        if head is None:
+            chunk_path, chunk_parent, chunk_depth = path, parent, depth
+        elif pack_kinds == ["block"]:
+            chunk_path, chunk_parent, chunk_depth = path + PATH_SEP + lines[pack[0]].strip(), head, depth + 1
+        else:
+            chunk_path, chunk_parent, chunk_depth = path, head, depth + 1
+        chunks = tag(emit_chunks(make, list(pack), source, sizing), chunk_path, chunk_parent, chunk_depth)
+        if head is None:
+            head = chunks[0]
+        out.extend(chunks)
+        pack.clear()
+        pack_kinds.clear()
+
+    for kind, seg in segments:
+        seg_len = length(seg)
+        if seg_len > sizing.max_len:
+            flush()
+            if kind == "block":
+                child_path = path + PATH_SEP + lines[seg[0]].strip()
+                out.extend(emit_hierarchy(make, child_path, seg, source, sizing, head, depth + 1))
+            else:
+                out.extend(tag(emit_chunks(make, seg, source, sizing), path, head, depth + 1))
+            pack_len = 0
+            continue
+        if pack and pack_len + 1 + seg_len > sizing.max_len:
+            flush()
+            pack_len = 0
+        pack_len = pack_len + 1 + seg_len if pack else seg_len
+        pack.extend(seg)
+        pack_kinds.append(kind)
+    flush()
+    return out
 
 def make_explicit_chunk(device, header, content):
-    return {
-        "content": content,
-        "metadata": {
-            "device": device,
-            "chunk_type": "explicit",
-            "section": header
-        }
-    }
+    return ChunkRecord(content, device, "explicit", section=header)
 
 def make_global_chunk(device, content):
-    return {
-        "content": content,
-        "metadata": {
-            "device": device,
-            "chunk_type": "global"
-        }
-    }
-
-def chunk_config(device, text, section_start_regex, comment_prefixes=None, ignore_lines=None, splitter=None):
+    return ChunkRecord(content, device, "global")
+
+def chunk_config(device, text, section_start_regex, comment_prefixes=None, ignore_lines=None, splitter=None, sizing=None):
     if comment_prefixes is None:
         comment_prefixes = ["!"]
     if ignore_lines is None:
         ignore_lines = set()
-    if splitter is None:
-        splitter = SIZE_SPLITTER
+    if sizing is None:
+        sizing = CharSizing(splitter=splitter) if splitter else DEFAULT_SIZING
 
-    lines = text.splitlines()
+    source = SourceLines(text)
+    lines = source.lines
     chunks = []
 
     current = []
@@ -119,10 +252,10 @@ def chunk_config(device, text, section_start_regex, comment_prefixes=None, ignor
                 nxt = next_non_comment_non_blank(lines, idx, comment_prefixes, ignore_lines)
                 if nxt and not is_top_level(nxt):
                     continue
-                chunks.extend(emit_section(device, header, current, splitter))
+                chunks.extend(emit_section(device, header, current, source, sizing))
                 current, header = [], None
             if global_buffer:
-                chunks.extend(emit_global(device, global_buffer, splitter))
+                chunks.extend(emit_global(device, global_buffer, source, sizing))
                 global_buffer = []
             continue
 
@@ -133,28 +266,28 @@ def chunk_config(device, text, section_start_regex, comment_prefixes=None, ignor
         if is_top_level(line):
             if is_section_start(line, idx, lines, section_start_regex, comment_prefixes, ignore_lines):
                 if global_buffer:
-                    chunks.extend(emit_global(device, global_buffer, splitter))
+                    chunks.extend(emit_global(device, global_buffer, source, sizing))
                     global_buffer = []
                 if current:
-                    chunks.extend(emit_section(device, header, current, splitter))
+                    chunks.extend(emit_section(device, header, current, source, sizing))
                 header = stripped
-                current = [line]
+                current = [idx]
             else:
                 if current:
-                    chunks.extend(emit_section(device, header, current, splitter))
+                    chunks.extend(emit_section(device, header, current, source, sizing))
                     current, header = [], None
-                global_buffer.append(line)
+                global_buffer.append(idx)
         else:
             if current:
-                current.append(line)
+                current.append(idx)
             else:
-                global_buffer.append(line)
+                global_buffer.append(idx)
 
     if current:
-        chunks.extend(emit_section(device, header, current, splitter))
+        chunks.extend(emit_section(device, header, current, source, sizing))
 
     if global_buffer:
-        chunks.extend(emit_global(device, global_buffer, splitter))
+        chunks.extend(emit_global(device, global_buffer, source, sizing))
 
     return chunks
 
@@ -163,29 +296,55 @@ def derive_section_type(section: Optional[str], chunk_type: Optional[str]) -> st
         return "global"
     return section.split()[0].lower()
 
-def build_chunks(device: str, os_type: str, text: str) -> List[Dict[str, Any]]:
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+def stable_chunk_id(device: str, section: Optional[str], occurrence: int, digest: str) -> str:
+    return f"{device}|{section or 'global'}|{occurrence}|{digest}"
+
+def assign_stable_ids(chunks: List[ChunkRecord]) -> List[ChunkRecord]:
+    """chunk_id = device|section|occurrence|content_hash.
+
+    `occurrence` counts earlier chunks of the device with the same section and
+    content, so IDs stay unique without depending on position: editing one
+    stanza only changes the IDs of that stanza's chunks.
+    """
+    seen = {}
+    for c in chunks:
+        if c.content_hash is None:
+            c.content_hash = content_hash(c.content)
+        key = (c.section, c.content_hash)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        c.chunk_id = stable_chunk_id(c.device, c.section, occurrence, c.content_hash)
+    # Hierarchical chunks reference their parent record until IDs exist
+    for c in chunks:
+        if isinstance(c.parent_id, ChunkRecord):
+            c.parent_id = c.parent_id.chunk_id
+    return chunks
+
+def build_chunks(device: str, os_type: str, text: str, sizing=None) -> List[ChunkRecord]:
     from ..parsers import get_parser
     parser = get_parser(os_type)
-    chunks = parser.chunk(device, text)
+    chunks = parser.chunk(device, text, sizing=sizing.for_parser(parser) if sizing else None)
+    os_type = sys.intern(os_type)
     for idx, c in enumerate(chunks):
-        c["metadata"]["os_type"] = os_type
-        c["metadata"]["chunk_index"] = idx
-        c["metadata"]["section_type"] = derive_section_type(
-            c["metadata"].get("section"),
-            c["metadata"].get("chunk_type")
-        )
-        c["metadata"]["chunk_id"] = f"{device}|{c['metadata'].get('section','global')}|{idx}"
-    return chunks
+        c.os_type = os_type
+        c.chunk_index = idx
+        c.section_type = sys.intern(derive_section_type(c.section, c.chunk_type))
+    return assign_stable_ids(chunks)
 
-def write_chunks(device: str, chunks: List[Dict[str, Any]], out_dir: str) -> str:
+def write_chunks(device: str, chunks: List[ChunkRecord], out_dir: str) -> str:
+    """Write `<device>.json` plus its cross-reference index (`xref/<device>.json`)."""
     os.makedirs(out_dir, exist_ok=True)
     out_path = os.path.join(out_dir, f"{device}.json")
     with open(out_path, "w") as f:
-        json.dump(chunks, f, indent=2)
+        json.dump(records_to_dicts(chunks), f, indent=2)
+    write_xref(build_xref(chunks, device=device), out_dir)
     return out_path
 
-def convert_config_to_chunks(device: str, os_type: str, text: str, out_dir: Optional[str] = None) -> List[Dict[str, Any]]:
-    chunks = build_chunks(device, os_type, text)
+def convert_config_to_chunks(device: str, os_type: str, text: str, out_dir: Optional[str] = None, sizing=None) -> List[ChunkRecord]:
+    chunks = build_chunks(device, os_type, text, sizing=sizing)
     if out_dir:
         write_chunks(device, chunks, out_dir)
     return chunks
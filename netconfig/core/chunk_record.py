@@ -0,0 +1,81 @@
+"""Compact in-memory chunk record.
+
+Chunks are built and passed around as `ChunkRecord` objects (`__slots__`, no
+per-chunk dicts). Repeated strings (device, os_type, chunk_type, section,
+section_type) are interned so fleet-wide runs share one copy of each.
+Convert with `to_dict()` / `from_dict()` only when reading or writing the
+JSON data model (see DEVELOPER.md).
+"""
+import sys
+from typing import Any, Dict, List, Optional
+
+# Metadata keys in serialization order
+METADATA_FIELDS = (
+    "device", "chunk_type", "section", "os_type", "chunk_index", "section_type", "chunk_id", "content_hash",
+    "line_start", "line_end", "byte_start", "byte_end", "section_path", "parent_id", "depth",
+)
+# Metadata that shifts when lines are inserted above a chunk
+POSITION_FIELDS = ("chunk_index", "line_start", "line_end", "byte_start", "byte_end")
+
+def intern_str(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+class ChunkRecord:
+    __slots__ = ("content",) + METADATA_FIELDS + ("extra",)
+
+    def __init__(self, content: str, device: str, chunk_type: str, section: Optional[str] = None,
+                 os_type: Optional[str] = None, chunk_index: Optional[int] = None,
+                 section_type: Optional[str] = None, chunk_id: Optional[str] = None,
+                 content_hash: Optional[str] = None, line_start: Optional[int] = None,
+                 line_end: Optional[int] = None, byte_start: Optional[int] = None,
+                 byte_end: Optional[int] = None, section_path: Optional[str] = None,
+                 parent_id: Optional[str] = None, depth: Optional[int] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        self.content = content
+        self.device = intern_str(device)
+        self.chunk_type = intern_str(chunk_type)
+        self.section = intern_str(section)
+        self.os_type = intern_str(os_type)
+        self.chunk_index = chunk_index
+        self.section_type = intern_str(section_type)
+        self.chunk_id = chunk_id
+        self.content_hash = content_hash
+        # Source span: 1-based inclusive lines, [byte_start, byte_end) bytes
+        self.line_start = line_start
+        self.line_end = line_end
+        self.byte_start = byte_start
+        self.byte_end = byte_end
+        # Hierarchical chunking: "router bgp 65001 > vrf BLUE", parent chunk_id, nesting depth
+        self.section_path = intern_str(section_path)
+        self.parent_id = parent_id
+        self.depth = depth
+        # Metadata keys outside METADATA_FIELDS (added by other tools), kept for round trips
+        self.extra = extra or None
+
+    def metadata(self) -> Dict[str, Any]:
+        meta = {}
+        for name in METADATA_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                meta[name] = value
+        if self.extra:
+            meta.update((k, v) for k, v in self.extra.items() if k not in meta)
+        return meta
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"content": self.content, "metadata": self.metadata()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ChunkRecord":
+        meta = data.get("metadata", {})
+        extra = {k: v for k, v in meta.items() if k not in METADATA_FIELDS}
+        return cls(data.get("content", ""), **{name: meta.get(name) for name in METADATA_FIELDS}, extra=extra)
+
+    def __repr__(self):
+        return f"ChunkRecord({self.chunk_id or self.section or self.chunk_type!r})"
+
+def records_to_dicts(records: List[ChunkRecord]) -> List[Dict[str, Any]]:
+    return [r.to_dict() for r in records]
+
+def records_from_dicts(data: List[Dict[str, Any]]) -> List[ChunkRecord]:
+    return [ChunkRecord.from_dict(d) for d in data]
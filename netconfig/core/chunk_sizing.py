@@ -0,0 +1,175 @@
+"""Chunk size policies: character-based (default) or token-based (tiktoken)."""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ..utils.tokens import get_encoding
+
+SPLIT_THRESHOLD_CHARS = 1200
+
+SIZE_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=800,
+    chunk_overlap=100
+)
+
+# Target chunk size per embedding model (tokens)
+MODEL_TOKEN_TARGETS = {
+    "text-embedding-3-small": 512,
+    "text-embedding-3-large": 512,
+    "text-embedding-ada-002": 512,
+}
+DEFAULT_MAX_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 32
+
+class CharSizing:
+    """Original behavior: split stanzas over 1200 chars into 800/100 char pieces.
+    With `hierarchical`, oversized stanzas are split along their indentation
+    tree instead (see chunk_builder.emit_hierarchy)."""
+
+    unit = "chars"
+
+    def __init__(self, max_len: int = SPLIT_THRESHOLD_CHARS, splitter=None, hierarchical: bool = False):
+        self.max_len = max_len
+        self.target = max_len
+        self.splitter = splitter or SIZE_SPLITTER
+        self.hierarchical = hierarchical
+
+    def length(self, text: str) -> int:
+        return len(text)
+
+    def for_parser(self, parser):
+        return self
+
+class TokenSizing:
+    """Split stanzas over `max_tokens` into pieces of at most `max_tokens`.
+
+    The encoding is cached per model, so every chunk (and every parser)
+    shares one tokenizer instance. With `per_os` False (an explicit
+    --chunk-tokens), os_max_tokens and parser CHUNK_MAX_TOKENS are ignored.
+    """
+
+    unit = "tokens"
+
+    def __init__(self, max_tokens: Optional[int] = None, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                 model: Optional[str] = None, os_max_tokens: Optional[Dict[str, int]] = None,
+                 hierarchical: bool = False, per_os: bool = True):
+        self.model = model
+        self.per_os = per_os
+        self.hierarchical = hierarchical
+        self.max_len = max_tokens or MODEL_TOKEN_TARGETS.get(model, DEFAULT_MAX_TOKENS)
+        self.target = self.max_len
+        self.overlap_tokens = overlap_tokens
+        self.os_max_tokens = self._resolve_os_keys(os_max_tokens or {})
+        self._splitter = None
+
+    @staticmethod
+    def _resolve_os_keys(os_max_tokens: Dict[str, int]) -> Dict[str, int]:
+        # Keyed by parser NAME, so aliases such as iosxe or ios-xr apply too
+        from ..parsers import get_parser
+        return {get_parser(os_type).NAME: max_tokens for os_type, max_tokens in os_max_tokens.items()}
+
+    def length(self, text: str) -> int:
+        return len(get_encoding(self.model).encode(text, disallowed_special=()))
+
+    @property
+    def splitter(self):
+        if self._splitter is None:
+            self._splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.max_len,
+                chunk_overlap=min(self.overlap_tokens, self.max_len // 2),
+                length_function=self.length
+            )
+        return self._splitter
+
+    def for_parser(self, parser):
+        if not self.per_os:
+            return self
+        # config override by parser name, then the parser's own default
+        max_tokens = self.os_max_tokens.get(parser.NAME) or getattr(parser, "CHUNK_MAX_TOKENS", None)
+        if not max_tokens or max_tokens == self.max_len:
+            return self
+        return get_token_sizing(max_tokens, self.overlap_tokens, self.model, self.hierarchical)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_splitter"] = None
+        return state
+
+@lru_cache(maxsize=None)
+def get_token_sizing(max_tokens: Optional[int] = None, overlap_tokens: int = DEFAULT_OVERLAP_TOKENS,
+                     model: Optional[str] = None, hierarchical: bool = False) -> TokenSizing:
+    return TokenSizing(max_tokens, overlap_tokens, model, hierarchical=hierarchical)
+
+DEFAULT_SIZING = CharSizing()
+
+def percentile(values: List[int], pct: float) -> int:
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+def chunk_sizes(chunks, sizing=None) -> List[int]:
+    sizing = sizing or DEFAULT_SIZING
+    return [sizing.length(c.content) for c in chunks]
+
+def chunk_targets(chunks, sizing=None) -> List[int]:
+    """Budget each chunk was sized to: its parser's max_len under `sizing`
+    (os_max_tokens / CHUNK_MAX_TOKENS applied)."""
+    from ..parsers import get_parser
+    sizing = sizing or DEFAULT_SIZING
+    by_os: Dict[Optional[str], int] = {}
+    targets = []
+    for c in chunks:
+        if c.os_type not in by_os:
+            by_os[c.os_type] = sizing.for_parser(get_parser(c.os_type)).max_len
+        targets.append(by_os[c.os_type])
+    return targets
+
+def size_report(sizes: List[int], sizing=None, targets: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Size distribution of chunk sizes relative to each chunk's target
+    (`targets`, from chunk_targets; the sizing target when omitted)."""
+    sizing = sizing or DEFAULT_SIZING
+    target = sizing.target
+    if targets is None:
+        targets = [target] * len(sizes)
+    buckets = {"<25%": 0, "25-50%": 0, "50-75%": 0, "75-100%": 0, ">100%": 0}
+    for size, chunk_target in zip(sizes, targets):
+        ratio = size / chunk_target if chunk_target else 0
+        if ratio < 0.25:
+            buckets["<25%"] += 1
+        elif ratio < 0.5:
+            buckets["25-50%"] += 1
+        elif ratio < 0.75:
+            buckets["50-75%"] += 1
+        elif ratio <= 1.0:
+            buckets["75-100%"] += 1
+        else:
+            buckets[">100%"] += 1
+    return {
+        "unit": sizing.unit,
+        "target": target,
+        "targets": sorted(set(targets)),
+        "chunks": len(sizes),
+        "total": sum(sizes),
+        "min": min(sizes) if sizes else 0,
+        "p50": percentile(sizes, 50),
+        "p90": percentile(sizes, 90),
+        "max": max(sizes) if sizes else 0,
+        "mean_fill": round(sum(sizes) / sum(targets), 3) if sizes and sum(targets) else 0.0,
+        "buckets": buckets,
+    }
+
+def format_size_report(report: Dict[str, Any]) -> str:
+    targets = report.get("targets") or [report["target"]]
+    target = "/".join(str(t) for t in targets)
+    lines = [
+        f"chunks={report['chunks']} target={target} {report['unit']} "
+        f"min={report['min']} p50={report['p50']} p90={report['p90']} max={report['max']} "
+        f"mean_fill={report['mean_fill']:.0%}"
+    ]
+    total = report["chunks"] or 1
+    for name, count in report["buckets"].items():
+        bar = "#" * int(round(40 * count / total))
+        lines.append(f"  {name:>8} {count:6d} {bar}")
+    return "\n".join(lines)
@@ -0,0 +1,98 @@
+"""Zero-copy chunk views over memory-mapped config files.
+
+Chunks record their source span (`line_start`/`line_end`, 1-based inclusive,
+and `byte_start`/`byte_end`, half-open). `SourceFile` maps a config once and
+hands out `ChunkView`s: `.raw` is a memoryview slice of the mapping (no copy),
+and `.content` decodes the span on first access, dropping blank, comment and
+ignored lines the same way the parser did when the chunk was built.
+"""
+import mmap
+from typing import Iterable, List, Optional
+
+from .chunk_builder import is_comment_line, should_ignore_line
+
+class SourceFile:
+    def __init__(self, path: str, os_type: Optional[str] = None):
+        from ..parsers import get_parser
+        parser = get_parser(os_type)
+        self.path = path
+        self.comment_prefixes = getattr(parser, "COMMENT_PREFIXES", ["!"])
+        self.ignore_lines = getattr(parser, "IGNORE_LINES", set())
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files cannot be mapped
+            self._mm = b""
+        self._buf = memoryview(self._mm)
+
+    def __len__(self) -> int:
+        return len(self._mm)
+
+    def raw(self, byte_start: int, byte_end: int) -> memoryview:
+        return self._buf[byte_start:byte_end]
+
+    def keeps_line(self, line: str) -> bool:
+        """Whether the parser keeps `line` in chunk content (not blank, a
+        comment or an ignored line)."""
+        return bool(line.strip()) and not should_ignore_line(line, self.ignore_lines) \
+            and not is_comment_line(line, self.comment_prefixes)
+
+    def filter_text(self, text: str) -> str:
+        return "\n".join(line for line in text.splitlines() if self.keeps_line(line))
+
+    def view(self, chunk) -> "ChunkView":
+        if chunk.byte_start is None or chunk.byte_end is None:
+            raise ValueError(f"{chunk!r} has no source span; rebuild chunks to record byte offsets")
+        return ChunkView(self, chunk.byte_start, chunk.byte_end, chunk.line_start, chunk.line_end)
+
+    def views(self, chunks: Iterable) -> List["ChunkView"]:
+        return [self.view(c) for c in chunks]
+
+    def close(self):
+        # Views handed out must be released first (memoryview exports pin the map)
+        self._buf.release()
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ChunkView:
+    __slots__ = ("source", "byte_start", "byte_end", "line_start", "line_end", "_content")
+
+    def __init__(self, source: SourceFile, byte_start: int, byte_end: int,
+                 line_start: Optional[int] = None, line_end: Optional[int] = None):
+        self.source = source
+        self.byte_start = byte_start
+        self.byte_end = byte_end
+        self.line_start = line_start
+        self.line_end = line_end
+        self._content = None
+
+    @property
+    def raw(self) -> memoryview:
+        return self.source.raw(self.byte_start, self.byte_end)
+
+    @property
+    def text(self) -> str:
+        """Decoded source span, comments and blank lines included."""
+        with self.raw as buf:
+            return str(buf, "utf-8", "surrogateescape")
+
+    @property
+    def content(self) -> str:
+        """Chunk content as the parser emitted it, decoded on first access."""
+        if self._content is None:
+            self._content = self.source.filter_text(self.text)
+        return self._content
+
+    def __len__(self) -> int:
+        return self.byte_end - self.byte_start
+
+    def __repr__(self):
+        return f"ChunkView({self.source.path}:{self.line_start}-{self.line_end})"
@@ -0,0 +1,186 @@
+"""Section-level diff between two versions of a device config.
+
+Chunks are grouped into stanzas (consecutive explicit chunks with the same
+section, so split pieces stay together; each global chunk on its own) and
+every stanza gets a fingerprint over its chunks' content hashes. Matching
+stanzas by section (and occurrence) yields a `ConfigDelta`: added, removed
+and modified stanzas, plus the chunk-level work for downstream stores —
+chunks to insert, chunk_ids to delete, unchanged chunks whose chunk_index
+changed (moved) and unchanged chunks whose line/byte span shifted in place
+(shifted; only stores that keep spans need those).
+"""
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from .chunk_builder import build_chunks
+from .chunk_record import POSITION_FIELDS
+
+def stanza_fingerprint(chunks) -> str:
+    digest = hashlib.sha256()
+    for c in chunks:
+        digest.update(c.content_hash.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+class Stanza:
+    __slots__ = ("key", "section", "fingerprint", "chunks")
+
+    def __init__(self, key, section: Optional[str], chunks):
+        self.key = key
+        self.section = section
+        self.chunks = chunks
+        self.fingerprint = stanza_fingerprint(chunks)
+
+    def label(self) -> str:
+        return self.section or f"global ({self.chunks[0].content.splitlines()[0][:40]})"
+
+def group_stanzas(chunks) -> List[List]:
+    groups = []
+    prev = None
+    for c in chunks:
+        if c.chunk_type == "explicit" and groups and prev is not None \
+                and prev.chunk_type == "explicit" and prev.section == c.section:
+            groups[-1].append(c)
+        else:
+            groups.append([c])
+        prev = c
+    return groups
+
+def stanza_index(chunks) -> Dict[Any, Stanza]:
+    """Stanzas keyed by (section, occurrence); global chunks are keyed by
+    their fingerprint, so unchanged global lines match wherever they move."""
+    ordered = sorted(chunks, key=lambda c: c.chunk_index or 0)
+    index: Dict[Any, Stanza] = {}
+    seen: Dict[Any, int] = {}
+    for group in group_stanzas(ordered):
+        first = group[0]
+        if first.chunk_type == "explicit":
+            base = ("explicit", first.section)
+            stanza = Stanza(None, first.section, group)
+        else:
+            stanza = Stanza(None, None, group)
+            base = ("global", stanza.fingerprint)
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        stanza.key = base + (occurrence,)
+        index[stanza.key] = stanza
+    return index
+
+def positions(chunk) -> Dict[str, Any]:
+    return {name: getattr(chunk, name) for name in POSITION_FIELDS}
+
+class ConfigDelta:
+    def __init__(self, device: str, added: List[Stanza], removed: List[Stanza], modified: List[tuple],
+                 unchanged: int, upserts: List, deletes: List[str], moved: List, os_type: Optional[str] = None,
+                 shifted: Optional[List] = None):
+        self.device = device
+        self.os_type = os_type
+        self.added = added
+        self.removed = removed
+        # (old Stanza, new Stanza)
+        self.modified = modified
+        self.unchanged = unchanged
+        # Chunk-level work: new chunks to store/embed, stale chunk_ids, chunks whose
+        # chunk_index changed, chunks whose line/byte span changed at the same chunk_index
+        self.upserts = upserts
+        self.deletes = deletes
+        self.moved = moved
+        self.shifted = shifted or []
+
+    def is_empty(self) -> bool:
+        return not (self.upserts or self.deletes or self.moved or self.shifted)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "modified": len(self.modified),
+            "unchanged": self.unchanged,
+            "upserts": len(self.upserts),
+            "deletes": len(self.deletes),
+            "moved": len(self.moved),
+            "shifted": len(self.shifted),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "device": self.device,
+            "os_type": self.os_type,
+            "summary": self.summary(),
+            "added": [
+                {"section": s.section, "fingerprint": s.fingerprint, "chunks": [c.to_dict() for c in s.chunks]}
+                for s in self.added
+            ],
+            "removed": [
+                {"section": s.section, "fingerprint": s.fingerprint, "chunk_ids": [c.chunk_id for c in s.chunks]}
+                for s in self.removed
+            ],
+            "modified": [
+                {
+                    "section": new.section,
+                    "old_fingerprint": old.fingerprint,
+                    "fingerprint": new.fingerprint,
+                    "chunks": [c.to_dict() for c in new.chunks],
+                    "old_chunk_ids": [c.chunk_id for c in old.chunks],
+                }
+                for old, new in self.modified
+            ],
+            "upserts": [c.chunk_id for c in self.upserts],
+            "deletes": list(self.deletes),
+            "moved": [dict(positions(c), chunk_id=c.chunk_id) for c in self.moved],
+            "shifted": [dict(positions(c), chunk_id=c.chunk_id) for c in self.shifted],
+        }
+
+def diff_chunks(device: str, old_chunks, new_chunks) -> ConfigDelta:
+    old_index = stanza_index(old_chunks)
+    new_index = stanza_index(new_chunks)
+
+    added, removed, modified = [], [], []
+    unchanged = 0
+    for key, stanza in new_index.items():
+        old = old_index.get(key)
+        if old is None:
+            added.append(stanza)
+        elif old.fingerprint != stanza.fingerprint:
+            modified.append((old, stanza))
+        else:
+            unchanged += 1
+    removed = [stanza for key, stanza in old_index.items() if key not in new_index]
+
+    # Split pieces shared by the old and new version of a stanza keep their chunk_id
+    old_by_id = {c.chunk_id: c for c in old_chunks}
+    new_ids = {c.chunk_id for c in new_chunks}
+    changed_old = [c for s in removed for c in s.chunks] + [c for old, _ in modified for c in old.chunks]
+    changed_new = [c for s in added for c in s.chunks] + [c for _, new in modified for c in new.chunks]
+    upserts = [c for c in changed_new if c.chunk_id not in old_by_id]
+    deletes = [c.chunk_id for c in changed_old if c.chunk_id not in new_ids]
+    moved, shifted = [], []
+    for c in new_chunks:
+        old = old_by_id.get(c.chunk_id)
+        if old is None:
+            continue
+        if c.chunk_index != old.chunk_index:
+            moved.append(c)
+        elif positions(c) != positions(old):
+            shifted.append(c)
+    os_type = next((c.os_type for c in new_chunks if c.os_type), None)
+    return ConfigDelta(device, added, removed, modified, unchanged, upserts, deletes, moved, os_type, shifted)
+
+def diff_configs(device: str, os_type: str, old_text: str, new_text: str, sizing=None) -> ConfigDelta:
+    return diff_chunks(
+        device,
+        build_chunks(device, os_type, old_text, sizing=sizing),
+        build_chunks(device, os_type, new_text, sizing=sizing)
+    )
+
+def format_delta(delta: ConfigDelta) -> str:
+    counts = delta.summary()
+    lines = [
+        f"{delta.device}: stanzas added={counts['added']} removed={counts['removed']} "
+        f"modified={counts['modified']} unchanged={counts['unchanged']} | chunks "
+        f"upsert={counts['upserts']} delete={counts['deletes']} moved={counts['moved']} shifted={counts['shifted']}"
+    ]
+    lines.extend(f"  + {s.label()}" for s in delta.added)
+    lines.extend(f"  - {s.label()}" for s in delta.removed)
+    lines.extend(f"  ~ {new.label()}" for _, new in delta.modified)
+    return "\n".join(lines)
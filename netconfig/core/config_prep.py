@@ -25,21 +25,46 @@ def resolve_os_type(os_map: Optional[Dict[str, str]], filename: str, device: str
     return None
 
 def read_config(path: str) -> str:
-    with open(path) as f:
+    # Keep original line endings/bytes so chunk byte spans match the file
+    with open(path, newline="", encoding="utf-8", errors="surrogateescape") as f:
         return f.read()
 
+def resolve_config_os(device: str, filename: str, text: str, os_type: Optional[str] = None,
+                      os_map: Optional[Dict[str, str]] = None, auto_detect: bool = False, aliases=()) -> str:
+    """os_type from the CLI, else os_map (by any of `aliases` such as an archive
+    member path, then filename/device), else detection."""
+    resolved = os_type
+    if not resolved and os_map:
+        resolved = next((os_map[name] for name in aliases if name in os_map), None) \
+            or resolve_os_type(os_map, filename, device)
+    if not resolved and auto_detect:
+        detected, scores = detect_os_type(text)
+        if detected:
+            resolved = detected
+            print(f"[INFO] {device}: detected os_type={resolved} scores={scores}")
+        else:
+            resolved = "generic"
+            print(f"[WARN] {device}: OS detection ambiguous (scores={scores}). Using generic parser.")
+
+    if not resolved:
+        raise SystemExit(f"Missing os_type for {device}. Provide --os-type, --os-map, or --detect-os.")
+    return resolved
+
 def prepare_configs(
     config: Optional[str] = None,
     config_dir: Optional[str] = None,
     os_type: Optional[str] = None,
     os_map_path: Optional[str] = None,
-    detect_os: bool = False
+    detect_os: bool = False,
+    files: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     os_map = load_os_map(os_map_path)
     auto_detect = detect_os or (os_type is None and os_map_path is None)
     cfg_dir = config_dir or DEFAULT_CONFIG_DIR
 
-    if config:
+    if files is not None:
+        pass
+    elif config:
         files = [config]
     else:
         files = sorted([
@@ -55,23 +80,9 @@ def prepare_configs(
         filename = os.path.basename(path)
         device = os.path.splitext(filename)[0]
         text = read_config(path)
-
-        resolved = os_type or resolve_os_type(os_map, filename, device)
-        if not resolved and auto_detect:
-            detected, scores = detect_os_type(text)
-            if detected:
-                resolved = detected
-                print(f"[INFO] {device}: detected os_type={resolved} scores={scores}")
-            else:
-                resolved = "generic"
-                print(f"[WARN] {device}: OS detection ambiguous (scores={scores}). Using generic parser.")
-
-        if not resolved:
-            raise SystemExit(f"Missing os_type for {device}. Provide --os-type, --os-map, or --detect-os.")
-
         prepared.append({
             "device": device,
-            "os_type": resolved,
+            "os_type": resolve_config_os(device, filename, text, os_type, os_map, auto_detect),
             "text": text,
             "path": path
         })
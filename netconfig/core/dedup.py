@@ -0,0 +1,205 @@
+"""Fleet-wide content deduplication.
+
+Many stanzas are byte-identical across devices (line vty, class-maps, NTP,
+AAA, standard ACLs). `ContentStore` keeps each unique body once, keyed by
+`content_hash`, plus a reference table content_hash -> chunk metadata, so
+embedding and vector indexing run on unique bodies only and results can be
+resolved back to device chunks.
+"""
+import os
+import json
+from typing import Any, Dict, List, Optional
+
+from .chunk_record import POSITION_FIELDS
+
+REFS_FILE = "content_refs.json"
+
+class ContentStore:
+    def __init__(self, keep_bodies: bool = True):
+        self.keep_bodies = keep_bodies
+        self.bodies: Dict[str, str] = {}
+        self.refs: Dict[str, List[Dict[str, Any]]] = {}
+        self.section_types: Dict[str, str] = {}
+        self.total = 0
+
+    def add(self, chunks):
+        for c in chunks:
+            self.total += 1
+            if c.content_hash not in self.refs:
+                self.refs[c.content_hash] = []
+                self.section_types[c.content_hash] = c.section_type
+                if self.keep_bodies:
+                    self.bodies[c.content_hash] = c.content
+            meta = c.metadata()
+            meta.pop("content_hash", None)
+            self.refs[c.content_hash].append(meta)
+
+    def unique_count(self) -> int:
+        return len(self.refs)
+
+    def devices_for(self, digest: str) -> List[str]:
+        return sorted({ref["device"] for ref in self.refs.get(digest, [])})
+
+    def report(self) -> Dict[str, Any]:
+        by_type: Dict[str, List[int]] = {}
+        for digest, refs in self.refs.items():
+            counts = by_type.setdefault(self.section_types.get(digest) or "global", [0, 0])
+            counts[0] += len(refs)
+            counts[1] += 1
+        unique = self.unique_count()
+        return {
+            "chunks": self.total,
+            "unique": unique,
+            "dedup_ratio": round(self.total / unique, 2) if unique else 0.0,
+            "saved_pct": round(100.0 * (1 - unique / self.total), 1) if self.total else 0.0,
+            "by_section_type": {
+                name: {"chunks": total, "unique": uniq, "ratio": round(total / uniq, 2)}
+                for name, (total, uniq) in sorted(by_type.items(), key=lambda kv: -kv[1][0])
+            },
+        }
+
+    def save_refs(self, out_dir: str) -> str:
+        return save_refs(self.refs, out_dir)
+
+def save_refs(refs: Dict[str, List[Dict[str, Any]]], out_dir: str) -> str:
+    path = os.path.join(out_dir, REFS_FILE)
+    with open(path, "w") as f:
+        json.dump(refs, f)
+    return path
+
+def remove_refs(out_dir: str) -> bool:
+    """Drop the reference table, so a plain index built over a deduped one
+    is not read as deduped."""
+    path = os.path.join(out_dir, REFS_FILE)
+    if not os.path.isfile(path):
+        return False
+    os.remove(path)
+    return True
+
+def format_dedup_report(report: Dict[str, Any], top: int = 10) -> str:
+    lines = [
+        f"chunks={report['chunks']} unique={report['unique']} "
+        f"dedup_ratio={report['dedup_ratio']}x saved={report['saved_pct']}%"
+    ]
+    for name, stats in list(report["by_section_type"].items())[:top]:
+        lines.append(f"  {name:<16} chunks={stats['chunks']:<6} unique={stats['unique']:<6} ratio={stats['ratio']}x")
+    return "\n".join(lines)
+
+def load_refs(index_dir: str) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+    """Reference table saved next to a deduped index, or None for a regular index."""
+    path = os.path.join(index_dir, REFS_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def apply_refs_delta(refs: Dict[str, List[Dict[str, Any]]], delta):
+    """Patch a reference table with a ConfigDelta in place.
+    Returns (new_bodies, orphaned): chunks whose body is not indexed yet
+    (content_hash -> chunk) and content hashes no chunk references anymore."""
+    deleted = set(delta.deletes)
+    moved = {c.chunk_id: c for c in delta.moved + delta.shifted}
+    touched = set()
+    for digest, entries in refs.items():
+        kept = []
+        for ref in entries:
+            if ref.get("device") != delta.device:
+                kept.append(ref)
+                continue
+            if ref.get("chunk_id") in deleted:
+                touched.add(digest)
+                continue
+            if ref.get("chunk_id") in moved:
+                chunk = moved[ref["chunk_id"]]
+                for name in POSITION_FIELDS:
+                    if getattr(chunk, name) is not None:
+                        ref[name] = getattr(chunk, name)
+            kept.append(ref)
+        entries[:] = kept
+
+    new_bodies = {}
+    for c in delta.upserts:
+        meta = c.metadata()
+        meta.pop("content_hash", None)
+        if c.content_hash not in refs:
+            refs[c.content_hash] = []
+            new_bodies[c.content_hash] = c
+        refs[c.content_hash].append(meta)
+
+    orphaned = [digest for digest in touched if not refs.get(digest)]
+    for digest in orphaned:
+        refs.pop(digest, None)
+    return new_bodies, orphaned
+
+def resolve_hits(docs, refs: Dict[str, List[Dict[str, Any]]], device: Optional[str] = None):
+    """Map unique-body hits to device chunks. With `device`, one Document per
+    chunk of that device holding the body; without, one Document per body
+    (metadata of its first chunk plus `devices`, every device holding it), so
+    a common body does not fill k with copies."""
+    from ..utils.embeddings import Document
+    resolved = []
+    for doc in docs:
+        digest = doc.metadata.get("content_hash")
+        entries = refs.get(digest, [])
+        if not device:
+            if entries:
+                meta = dict(entries[0])
+                meta["content_hash"] = digest
+                meta["devices"] = sorted({ref.get("device") for ref in entries if ref.get("device")})
+                resolved.append(Document(page_content=doc.page_content, metadata=meta))
+            continue
+        for ref in entries:
+            if ref.get("device") != device:
+                continue
+            meta = dict(ref)
+            meta["content_hash"] = digest
+            resolved.append(Document(page_content=doc.page_content, metadata=meta))
+    return resolved
+
+def scope_hits(hits, refs: Optional[Dict[str, List[Dict[str, Any]]]] = None, device: Optional[str] = None):
+    """[(Document, score)] -> [(Document, score)] resolved through `refs`
+    (deduped index) and/or kept to one device."""
+    scoped = []
+    for doc, score in hits:
+        if refs is not None:
+            scoped.extend((d, score) for d in resolve_hits([doc], refs, device))
+        elif not device or doc.metadata.get("device") == device:
+            scoped.append((doc, score))
+    return scoped
+
+def search_scoped(index, vectors, k: int = 8, refs=None, devices=None, max_fetch: int = 1024):
+    """Batch search returning up to k scoped hits per query vector:
+    [[(Document, score)]]. `devices` has one device (or None) per query.
+    Indexes that take `filter=` (`supports_filter`, the numpy backend) mask
+    chunk rows by device before scoring, one search per device. Otherwise
+    queries whose hits do not scope to k are searched again with a candidate
+    pool four times larger, until k resolve, the index runs out or max_fetch."""
+    devices = list(devices) if devices is not None else [None] * len(vectors)
+    results = [[] for _ in vectors]
+    if refs is None and getattr(index, "supports_filter", False):
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, device in enumerate(devices):
+            groups.setdefault(device, []).append(i)
+        for device, rows in groups.items():
+            hits = index.search_vectors([vectors[i] for i in rows], k=k, filter={"device": device} if device else None)
+            for i, row in zip(rows, hits):
+                results[i] = row
+        return results
+    pending = list(range(len(vectors)))
+    fetch = k
+    while pending:
+        hits = index.search_vectors([vectors[i] for i in pending], k=fetch)
+        retry = []
+        for i, row in zip(pending, hits):
+            results[i] = scope_hits(row, refs, devices[i])[:k]
+            unscoped = refs is None and not devices[i]
+            if not (unscoped or len(results[i]) >= k or len(row) < fetch or fetch >= max_fetch):
+                retry.append(i)
+        pending = retry
+        fetch = min(fetch * 4, max_fetch)
+    return results
+
+def search_resolved(index, refs, query: str, k: int = 8, device: Optional[str] = None, max_fetch: int = 1024):
+    """Similarity search returning up to k device chunks (see search_scoped)."""
+    hits = search_scoped(index, index.embed_queries([query]), k, refs, [device], max_fetch)[0]
+    return [doc for doc, _ in hits]
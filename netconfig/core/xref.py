@@ -0,0 +1,185 @@
+"""Cross-reference index of named config objects.
+
+Each parser lists `XREF_DEFINITIONS` (top-level lines that define a named
+route-map/route-policy, prefix-list/prefix-set, community list, as-path list,
+ACL or VRF) and `XREF_REFERENCES` (lines anywhere that use one). Object types
+are vendor-neutral (`OBJECT_TYPES`), so an IOS-XR `route-policy` is a
+"route-map" and a `prefix-set` a "prefix-list". `build_xref` scans a device's
+chunks once and returns an `XrefIndex`: dict lookups from (type, name) to the
+defining and referencing chunk_ids, and `closure()` to expand chunks to
+everything they depend on (neighbor -> route-map -> prefix-list -> ...).
+"""
+import os
+import re
+import json
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+XREF_DIR = "xref"
+OBJECT_TYPES = ("route-map", "prefix-list", "community-list", "as-path-list", "acl", "vrf")
+# Keywords that multi-name patterns (`match community A B exact-match`) can capture
+NAME_STOP_WORDS = {"exact-match", "all", "in", "out"}
+# Free-text lines (`description uplink to vrf CUSTOMER`, `10 remark ...`) reference nothing
+FREE_TEXT_REGEX = re.compile(r"^\s*(?:\d+\s+)?(?:description|remark)\b", re.IGNORECASE)
+
+Key = Tuple[str, str]
+
+def build_xref_regexes(patterns: List[Tuple[str, str]]) -> List[Tuple[str, "re.Pattern"]]:
+    """Compile (object_type, pattern) pairs; a pattern's `name` group holds
+    one or more whitespace-separated object names."""
+    for obj_type, _ in patterns:
+        if obj_type not in OBJECT_TYPES:
+            raise ValueError(f"Unknown xref object type '{obj_type}'")
+    return [(obj_type, re.compile(pattern)) for obj_type, pattern in patterns]
+
+def match_names(regexes, line: str) -> Set[Key]:
+    keys = set()
+    for obj_type, regex in regexes:
+        for m in regex.finditer(line):
+            keys.update((obj_type, name) for name in m.group("name").split() if name not in NAME_STOP_WORDS)
+    return keys
+
+class XrefIndex:
+    def __init__(self, device: Optional[str] = None):
+        self.device = device
+        # (type, name) -> chunk_ids, in chunk order
+        self.definitions: Dict[Key, List[str]] = {}
+        self.references: Dict[Key, List[str]] = {}
+        # chunk_id -> (type, name) keys
+        self.chunk_defs: Dict[str, List[Key]] = {}
+        self.chunk_refs: Dict[str, List[Key]] = {}
+
+    def add_chunk(self, chunk, definition_regexes, reference_regexes):
+        defined: Set[Key] = set()
+        referenced: Set[Key] = set()
+        # Split pieces of a stanza share its header as `section`
+        if chunk.section:
+            defined |= match_names(definition_regexes, chunk.section)
+        for line in chunk.content.splitlines():
+            if FREE_TEXT_REGEX.match(line):
+                continue
+            if line and not line[0].isspace():
+                found = match_names(definition_regexes, line)
+                if found:
+                    defined |= found
+                    continue
+            referenced |= match_names(reference_regexes, line)
+        referenced -= defined
+        if defined:
+            self.chunk_defs[chunk.chunk_id] = sorted(defined)
+            for key in self.chunk_defs[chunk.chunk_id]:
+                self.definitions.setdefault(key, []).append(chunk.chunk_id)
+        if referenced:
+            self.chunk_refs[chunk.chunk_id] = sorted(referenced)
+            for key in self.chunk_refs[chunk.chunk_id]:
+                self.references.setdefault(key, []).append(chunk.chunk_id)
+
+    def definition(self, obj_type: str, name: str) -> List[str]:
+        """chunk_ids defining the object (several for split stanzas or
+        multi-entry route-maps/prefix-lists); empty if undefined."""
+        return self.definitions.get((obj_type, name), [])
+
+    def referrers(self, obj_type: str, name: str) -> List[str]:
+        return self.references.get((obj_type, name), [])
+
+    def defines(self, chunk_id: str) -> List[Key]:
+        return self.chunk_defs.get(chunk_id, [])
+
+    def refs(self, chunk_id: str) -> List[Key]:
+        return self.chunk_refs.get(chunk_id, [])
+
+    def dependencies(self, chunk_id: str) -> List[str]:
+        """chunk_ids defining the objects `chunk_id` references (one hop)."""
+        deps = []
+        for key in self.refs(chunk_id):
+            deps.extend(self.definitions.get(key, []))
+        return deps
+
+    def closure(self, chunk_ids: Iterable[str], max_depth: Optional[int] = None) -> List[str]:
+        """`chunk_ids` plus the transitive definitions they depend on,
+        breadth-first (nearest dependencies first), without duplicates."""
+        order: List[str] = []
+        seen: Set[str] = set()
+        queue = deque()
+        for cid in chunk_ids:
+            if cid not in seen:
+                seen.add(cid)
+                queue.append((cid, 0))
+        while queue:
+            cid, depth = queue.popleft()
+            order.append(cid)
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for dep in self.dependencies(cid):
+                if dep not in seen:
+                    seen.add(dep)
+                    queue.append((dep, depth + 1))
+        return order
+
+    def unresolved(self) -> List[Key]:
+        """Referenced objects with no definition on the device."""
+        return sorted(key for key in self.references if key not in self.definitions)
+
+    def to_dict(self) -> Dict:
+        return {
+            "device": self.device,
+            "objects": [
+                {
+                    "type": obj_type,
+                    "name": name,
+                    "defined_in": self.definitions.get((obj_type, name), []),
+                    "referenced_by": self.references.get((obj_type, name), []),
+                }
+                for obj_type, name in sorted(set(self.definitions) | set(self.references))
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "XrefIndex":
+        index = cls(data.get("device"))
+        for obj in data.get("objects", []):
+            key = (obj["type"], obj["name"])
+            if obj.get("defined_in"):
+                index.definitions[key] = list(obj["defined_in"])
+                for cid in obj["defined_in"]:
+                    index.chunk_defs.setdefault(cid, []).append(key)
+            if obj.get("referenced_by"):
+                index.references[key] = list(obj["referenced_by"])
+                for cid in obj["referenced_by"]:
+                    index.chunk_refs.setdefault(cid, []).append(key)
+        return index
+
+    def __len__(self) -> int:
+        return len(set(self.definitions) | set(self.references))
+
+def build_xref(chunks, os_type: Optional[str] = None, device: Optional[str] = None) -> XrefIndex:
+    """Index one device's chunks (ids must be assigned). Parsers without
+    xref patterns (generic) give an empty index."""
+    from ..parsers import get_parser
+    first = chunks[0] if chunks else None
+    parser = get_parser(os_type or (first.os_type if first else None) or "generic")
+    index = XrefIndex(device or (first.device if first else None))
+    definition_regexes = getattr(parser, "XREF_DEFINITION_REGEXES", [])
+    reference_regexes = getattr(parser, "XREF_REFERENCE_REGEXES", [])
+    if not definition_regexes and not reference_regexes:
+        return index
+    for c in chunks:
+        index.add_chunk(c, definition_regexes, reference_regexes)
+    return index
+
+def xref_path(out_dir: str, device: str) -> str:
+    return os.path.join(out_dir, XREF_DIR, f"{device}.json")
+
+def write_xref(index: XrefIndex, out_dir: str) -> str:
+    path = xref_path(out_dir, index.device)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(index.to_dict(), f, indent=2)
+    return path
+
+def load_xref(out_dir: str, device: str) -> Optional[XrefIndex]:
+    path = xref_path(out_dir, device)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return XrefIndex.from_dict(json.load(f))
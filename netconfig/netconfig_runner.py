@@ -1,23 +1,52 @@
 import os
+import time
+import signal
 import argparse
 import json
+from collections import deque
 from datetime import datetime
 
 if __package__ is None or __package__ == "":
     import sys
     import os as _os
     sys.path.append(_os.path.abspath(_os.path.join(_os.path.dirname(__file__), "..")))
-    from netconfig.core.config_prep import prepare_configs
-    from netconfig.core.chunk_builder import convert_config_to_chunks
-    from netconfig.utils.embeddings import embed_chunks
+    from netconfig.core.config_prep import prepare_configs, read_config, load_os_map
+    from netconfig.core.archive_input import list_config_inputs, prepare_archive, is_archive
+    from netconfig.core.chunk_builder import build_chunks, write_chunks, convert_config_to_chunks, derive_section_type, assign_stable_ids
+    from netconfig.core.config_diff import diff_chunks, format_delta
+    from netconfig.core.xref import XREF_DIR, xref_path
+    from netconfig.utils.vector_index import VECTOR_BACKENDS
+    from netconfig.core.chunk_record import records_from_dicts, intern_str, POSITION_FIELDS
+    from netconfig.core.dedup import ContentStore, format_dedup_report, load_refs, save_refs, remove_refs, apply_refs_delta, REFS_FILE
+    from netconfig.core.chunk_sizing import CharSizing, TokenSizing, chunk_sizes, chunk_targets, size_report, format_size_report, percentile
+    from netconfig.utils.embeddings import embed_chunks, make_embedder, Document
 else:
-    from .core.config_prep import prepare_configs
-    from .core.chunk_builder import convert_config_to_chunks
-    from .utils.embeddings import embed_chunks
+    from .core.config_prep import prepare_configs, read_config, load_os_map
+    from .core.archive_input import list_config_inputs, prepare_archive, is_archive
+    from .core.chunk_builder import build_chunks, write_chunks, convert_config_to_chunks, derive_section_type, assign_stable_ids
+    from .core.config_diff import diff_chunks, format_delta
+    from .core.xref import XREF_DIR, xref_path
+    from .utils.vector_index import VECTOR_BACKENDS
+    from .core.chunk_record import records_from_dicts, intern_str, POSITION_FIELDS
+    from .core.dedup import ContentStore, format_dedup_report, load_refs, save_refs, remove_refs, apply_refs_delta, REFS_FILE
+    from .core.chunk_sizing import CharSizing, TokenSizing, chunk_sizes, chunk_targets, size_report, format_size_report, percentile
+    from .utils.embeddings import embed_chunks, make_embedder, Document
 
 DEFAULT_CONFIG_DIR = "configs"
 DEFAULT_CHUNK_DIR = "config_chunks"
 DEFAULT_FAISS_DIR = "index/faiss"
+DELTA_DIR = "deltas"
+# Seconds before a watch delta whose Mongo/FAISS update failed is recomputed
+WATCH_SINK_RETRY = 30.0
+# Archives submitted per worker process, and chunked members buffered per archive
+ARCHIVE_INFLIGHT = 2
+ARCHIVE_MEMBER_QUEUE = 4
+JOB_DB = "queue.sqlite"
+JOB_VECTOR_DIR = "vectors"
+# Device task names are file name stems, which cannot contain "/"
+FAISS_TASK = "/faiss-index"
+# FAISS task name before it was moved out of the device name space
+LEGACY_FAISS_TASK = "faiss-index"
 DEFAULT_MONGO_URI = "mongodb://localhost:27017"
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 DEFAULT_APP_CONFIG = os.path.join(REPO_ROOT, "config.yaml")
@@ -35,6 +64,11 @@ def prepare_out_dir(out_dir: str):
         if name.endswith(".json"):
             os.remove(os.path.join(out_dir, name))
             removed += 1
+    xref_dir = os.path.join(out_dir, XREF_DIR)
+    if os.path.isdir(xref_dir):
+        for name in os.listdir(xref_dir):
+            if name.endswith(".json"):
+                os.remove(os.path.join(xref_dir, name))
     if removed:
         print(f"[INFO] Cleared {removed} existing chunk files from {out_dir}")
 
@@ -58,26 +92,502 @@ def load_app_config(path: str = DEFAULT_APP_CONFIG):
         raise SystemExit("config.yaml must contain a top-level mapping.")
     return data
 
-def derive_section_type(section, chunk_type):
-    if chunk_type == "global" or not section:
-        return "global"
-    return section.split()[0].lower()
+def load_records(path: str):
+    return records_from_dicts(load_chunks(path))
 
 def normalize_chunks(chunks, device):
     for idx, c in enumerate(chunks):
-        meta = c.setdefault("metadata", {})
-        meta.setdefault("device", device)
-        if "chunk_index" not in meta:
-            meta["chunk_index"] = idx
-        if "section_type" not in meta:
-            meta["section_type"] = derive_section_type(meta.get("section"), meta.get("chunk_type"))
-        if "chunk_id" not in meta:
-            meta["chunk_id"] = f"{meta['device']}|{meta.get('section','global')}|{meta['chunk_index']}"
+        if c.device is None:
+            c.device = intern_str(device)
+        if c.chunk_index is None:
+            c.chunk_index = idx
+        if c.section_type is None:
+            c.section_type = intern_str(derive_section_type(c.section, c.chunk_type))
+    if any(c.chunk_id is None or c.content_hash is None for c in chunks):
+        assign_stable_ids(chunks)
     return chunks
 
-def run_chunking(args) -> str:
+def build_sizing(args, chunk_cfg):
+    """TokenSizing when token chunking is enabled (CLI or config.yaml), else None
+    (char default) or a hierarchical CharSizing."""
+    hierarchical = bool(args.hierarchical or chunk_cfg.get("hierarchical"))
+    if not (args.token_chunking or chunk_cfg.get("token_chunking")):
+        return CharSizing(hierarchical=True) if hierarchical else None
+    overlap = args.chunk_overlap_tokens
+    if overlap is None:
+        overlap = chunk_cfg.get("overlap_tokens", 32)
+    return TokenSizing(
+        max_tokens=args.chunk_tokens or chunk_cfg.get("max_tokens"),
+        overlap_tokens=overlap,
+        model=chunk_cfg.get("model") or args.embedding_model,
+        os_max_tokens=chunk_cfg.get("os_max_tokens"),
+        hierarchical=hierarchical,
+        # An explicit --chunk-tokens applies to every OS
+        per_os=not args.chunk_tokens
+    )
+
+def chunk_archive(path: str, os_type, os_map, detect_os, sizing, out):
+    """Archive worker: stream one archive's members into the chunker and put
+    each (device, chunks) on `out`, then None once the archive is done."""
+    try:
+        for item in prepare_archive(path, os_type, os_map, detect_os):
+            out.put((item["device"], build_chunks(item["device"], item["os_type"], item["text"], sizing=sizing)))
+    finally:
+        out.put(None)
+
+def drain_archive(out, future):
+    """(device, chunks) from one archive worker until it is done; re-raises
+    the worker's error (or a crashed pool) instead of waiting forever."""
+    from queue import Empty
+    while True:
+        try:
+            item = out.get(timeout=1.0)
+        except Empty:
+            if future.done():
+                future.result()
+                return
+            continue
+        if item is None:
+            future.result()
+            return
+        yield item
+
+def iter_archive_chunks(args, archives):
+    """(device, chunks) from archives; independent archives are decompressed
+    and chunked in parallel processes, one worker per archive. Each worker
+    streams members back over a bounded queue (ARCHIVE_MEMBER_QUEUE) and at
+    most ARCHIVE_INFLIGHT archives per worker are submitted at once; results
+    are yielded in archive and member order."""
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing import Manager
+    os_map = load_os_map(args.os_map)
+    workers = min(len(archives), args.archive_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        for path in archives:
+            for item in prepare_archive(path, args.os_type, os_map, args.detect_os):
+                yield item["device"], build_chunks(item["device"], item["os_type"], item["text"], sizing=args.sizing)
+        return
+    remaining = deque(archives)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        manager = Manager()
+
+        def submit():
+            out = manager.Queue(maxsize=ARCHIVE_MEMBER_QUEUE)
+            path = remaining.popleft()
+            pending.append((out, pool.submit(chunk_archive, path, args.os_type, os_map, args.detect_os, args.sizing, out)))
+
+        try:
+            while remaining and len(pending) < workers * ARCHIVE_INFLIGHT:
+                submit()
+            # The pool runs archives in submit order, so the oldest pending one always has a worker
+            while pending:
+                out, future = pending.popleft()
+                if remaining:
+                    submit()
+                yield from drain_archive(out, future)
+        finally:
+            for _, future in pending:
+                future.cancel()
+            # Workers blocked on a full queue nobody reads any more fail instead of hanging the pool
+            manager.shutdown()
+
+def reject_archives(args, mode: str):
+    """--diff and --watch read plain .cfg files only."""
+    if args.config:
+        archives = [args.config] if is_archive(args.config) else []
+    elif os.path.isdir(args.config_dir):
+        archives = [os.path.join(args.config_dir, n) for n in sorted(os.listdir(args.config_dir)) if is_archive(n)]
+    else:
+        archives = []
+    if args.diff and is_archive(args.diff):
+        archives.append(args.diff)
+    if archives:
+        raise SystemExit(
+            f"{mode} reads plain .cfg files only; archive inputs are not supported: {', '.join(archives)}. "
+            f"Extract them first or run without {mode}."
+        )
+
+def iter_device_chunks(args, write: bool = True):
+    """Chunk each config (plain files and archive members) and yield
+    (device, chunks), writing chunk JSON files unless `write` is False.
+    Size/dedup reports print after the last device."""
     out_dir = args.out_dir
-    prepare_out_dir(out_dir)
+    if write:
+        prepare_out_dir(out_dir)
+    files, archives = list_config_inputs(args.config, args.config_dir)
+    prepared = prepare_configs(
+        os_type=args.os_type,
+        os_map_path=args.os_map,
+        detect_os=args.detect_os,
+        files=files
+    ) if files else []
+
+    def chunk_inputs():
+        for item in prepared:
+            yield item["device"], build_chunks(item["device"], item["os_type"], item["text"], sizing=args.sizing)
+        if archives:
+            yield from iter_archive_chunks(args, archives)
+
+    sizes, targets = [], []
+    seen = set()
+    contents = ContentStore(keep_bodies=False) if args.dedup else None
+    for device, chunks in chunk_inputs():
+        if device in seen:
+            print(f"[WARN] {device}: found in more than one input; the later one replaces it")
+        seen.add(device)
+        if write:
+            write_chunks(device, chunks, out_dir)
+            print(f"[OK] {device}: {len(chunks)} chunks written to {out_dir}")
+        else:
+            print(f"[OK] {device}: {len(chunks)} chunks")
+        if args.size_report:
+            sizes.extend(chunk_sizes(chunks, args.size_report_sizing))
+            targets.extend(chunk_targets(chunks, args.size_report_sizing))
+        if contents is not None:
+            contents.add(chunks)
+        yield device, chunks
+    if args.size_report:
+        print("[INFO] Chunk size report:")
+        print(format_size_report(size_report(sizes, args.size_report_sizing, targets)))
+    if contents is not None:
+        print("[INFO] Dedup report:")
+        print(format_dedup_report(contents.report()))
+
+def run_chunking(args) -> str:
+    for _ in iter_device_chunks(args):
+        pass
+    return args.out_dir
+
+def chunk_doc(c, embedding=None, with_content: bool = True):
+    doc = {
+        "device": c.device,
+        "os_type": c.os_type,
+        "section": c.section,
+        "section_type": c.section_type,
+        "chunk_type": c.chunk_type,
+        "chunk_index": c.chunk_index,
+        "chunk_id": c.chunk_id,
+        "content_hash": c.content_hash,
+        # Storage mode, so a run with the other mode re-inserts the chunk
+        "dedup": not with_content,
+        "created_at": datetime.utcnow()
+    }
+    # With --dedup the body lives once in <base>_contents
+    if with_content:
+        doc["content"] = c.content
+    if embedding is not None:
+        doc["embedding"] = embedding
+    return doc
+
+def embed_or_lookup(chunks, args, vectors=None):
+    """Embeddings for chunks: from `vectors` (content_hash -> vector, computed
+    once in pipelined mode) when given, else one embedding call."""
+    if vectors is not None:
+        return [vectors[c.content_hash] for c in chunks]
+    return embed_chunks(chunks, args.embedding_model)
+
+def sync_device_chunks(store, args, device: str, chunks, vectors=None, released=None):
+    """Incremental update keyed by stable chunk_id: insert (and embed) only new
+    chunks, delete stale ones, and refresh chunk_index for moved ones. Chunks
+    stored in the other mode (--dedup or not) are re-inserted. content_hashes
+    of deleted chunks are added to `released` (for prune_contents)."""
+    chunks_collection = f"{args.collection}_chunks"
+    embed = args.embed and not args.dedup
+    projection = {"chunk_id": 1, "chunk_index": 1, "content_hash": 1, "dedup": 1, "embedding": {"$slice": 1}}
+    existing = {d.get("chunk_id"): d for d in store.find(chunks_collection, {"device": device}, projection)}
+    current_ids = {c.chunk_id for c in chunks}
+
+    stale = [cid for cid in existing if cid not in current_ids]
+    if released is not None:
+        released.update(existing[cid].get("content_hash") for cid in stale)
+    new = [
+        c for c in chunks
+        if c.chunk_id not in existing or (embed and "embedding" not in existing[c.chunk_id])
+        # Docs written before the mode was recorded held their content
+        or bool(existing[c.chunk_id].get("dedup", False)) != bool(args.dedup)
+    ]
+    new_ids = {c.chunk_id for c in new}
+    moved = [
+        c for c in chunks
+        if c.chunk_id in existing and c.chunk_id not in new_ids
+        and existing[c.chunk_id].get("chunk_index") != c.chunk_index
+    ]
+
+    replaced = [cid for cid in new_ids if cid in existing]
+    if stale or replaced:
+        store.delete_many(chunks_collection, {"device": device, "chunk_id": {"$in": stale + replaced}})
+    embeddings = embed_or_lookup(new, args, vectors) if embed and new else None
+    store.insert_many(chunks_collection, [
+        chunk_doc(c, embeddings[i] if embeddings is not None else None, with_content=not args.dedup)
+        for i, c in enumerate(new)
+    ])
+    store.bulk_update(chunks_collection, [
+        ({"device": device, "chunk_id": c.chunk_id}, {"$set": {"chunk_index": c.chunk_index}})
+        for c in moved
+    ])
+    return {"added": len(new), "removed": len(stale), "reindexed": len(moved), "unchanged": len(chunks) - len(new)}
+
+def sync_contents(store, args, chunks, vectors=None) -> int:
+    """Store unique bodies in <base>_contents (_id = content_hash). Only bodies
+    not stored yet (fleet-wide) are inserted and embedded."""
+    contents_collection = f"{args.collection}_contents"
+    unique = {}
+    for c in chunks:
+        unique.setdefault(c.content_hash, c)
+    projection = {"_id": 1, "embedding": {"$slice": 1}}
+    existing = {d["_id"]: d for d in store.find(contents_collection, {"_id": {"$in": list(unique)}}, projection)}
+    missing = [
+        c for digest, c in unique.items()
+        if digest not in existing or (args.embed and "embedding" not in existing[digest])
+    ]
+    replaced = [c.content_hash for c in missing if c.content_hash in existing]
+    if replaced:
+        store.delete_many(contents_collection, {"_id": {"$in": replaced}})
+    embeddings = embed_or_lookup(missing, args, vectors) if args.embed and missing else None
+    docs = []
+    for i, c in enumerate(missing):
+        doc = {"_id": c.content_hash, "content": c.content, "section_type": c.section_type}
+        if embeddings is not None:
+            doc["embedding"] = embeddings[i]
+        docs.append(doc)
+    store.insert_many(contents_collection, docs)
+    return len(missing)
+
+def prune_contents(store, args, hashes) -> int:
+    """Delete bodies in <base>_contents that no chunk references any more.
+    Only `hashes` (bodies of chunks just deleted) are checked."""
+    hashes = [h for h in set(hashes) if h]
+    if not hashes:
+        return 0
+    projection = {"content_hash": 1}
+    live = {d.get("content_hash") for d in store.find(f"{args.collection}_chunks", {"content_hash": {"$in": hashes}}, projection)}
+    orphaned = [h for h in hashes if h not in live]
+    if orphaned:
+        store.delete_many(f"{args.collection}_contents", {"_id": {"$in": orphaned}})
+    return len(orphaned)
+
+def push_device_mongo(store, args, device: str, chunks, vectors=None):
+    os_type = chunks[0].os_type if chunks else None
+    device_doc = {"updated_at": datetime.utcnow()}
+    if os_type:
+        device_doc["os_type"] = os_type
+    store.upsert(args.collection, {"_id": device}, device_doc)
+
+    released = set()
+    counts = sync_device_chunks(store, args, device, chunks, vectors, released)
+    if args.dedup:
+        counts["new_bodies"] = sync_contents(store, args, chunks, vectors)
+        counts["pruned_bodies"] = prune_contents(store, args, released)
+    summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+    if store.dry_run:
+        print(f"[DRY-RUN] {device}: {len(chunks)} chunks ready ({summary}, embed={bool(args.embed)})")
+    else:
+        print(f"[OK] {device}: {len(chunks)} chunks synced ({summary}, embed={bool(args.embed)})")
+
+def run_mongo(args, chunks_dir: str):
+    store = open_mongo_store(args)
+    for path in collect_chunk_files(chunks_dir):
+        device = os.path.splitext(os.path.basename(path))[0]
+        push_device_mongo(store, args, device, normalize_chunks(load_records(path), device))
+    store.close()
+
+def faiss_docs(chunks, contents=None):
+    """(docs, ids) to index for a device: one doc per chunk (id = chunk_id), or
+    with a ContentStore only bodies not seen before (id = content_hash)."""
+    docs, ids = [], []
+    if contents is None:
+        for c in chunks:
+            docs.append(Document(page_content=c.content, metadata=c.metadata()))
+            ids.append(c.chunk_id)
+        return docs, ids
+    # Index unique bodies only; content_refs.json maps them back to device chunks
+    fresh = {}
+    for c in chunks:
+        if c.content_hash not in contents.refs:
+            fresh.setdefault(c.content_hash, c)
+    contents.add(chunks)
+    for digest, c in fresh.items():
+        meta = {"content_hash": digest, "section_type": c.section_type,
+                "chunk_type": c.chunk_type, "section": c.section}
+        docs.append(Document(page_content=c.content, metadata=meta))
+        ids.append(digest)
+    return docs, ids
+
+def vector_index_class(args):
+    """FaissIndex or NumpyIndex, per --vector-backend."""
+    if __package__ is None or __package__ == "":
+        from netconfig.utils.vector_index import get_index_class
+    else:
+        from .utils.vector_index import get_index_class
+    return get_index_class(args.vector_backend)
+
+def save_faiss(args, index, contents=None):
+    os.makedirs(args.faiss_dir, exist_ok=True)
+    index.save(args.faiss_dir)
+    if contents is not None:
+        contents.save_refs(args.faiss_dir)
+        print(f"[INFO] Vector index dedup: {format_dedup_report(contents.report(), top=0)}")
+    elif remove_refs(args.faiss_dir):
+        print(f"[INFO] Removed {REFS_FILE} left by an earlier --dedup build in {args.faiss_dir}")
+    print(f"[DONE] {type(index).__name__} created at {args.faiss_dir}")
+
+def run_faiss(args, chunks_dir: str):
+    index_cls = vector_index_class(args)
+    docs, ids = [], []
+    contents = ContentStore(keep_bodies=False) if args.dedup else None
+    for path in collect_chunk_files(chunks_dir):
+        device = os.path.splitext(os.path.basename(path))[0]
+        device_docs, device_ids = faiss_docs(normalize_chunks(load_records(path), device), contents)
+        docs.extend(device_docs)
+        ids.extend(device_ids)
+    if not docs:
+        print("[WARN] No chunks to index; FAISS index not written")
+        return
+    index = index_cls.from_documents(docs, args.embedding_model, ids=ids)
+    save_faiss(args, index, contents)
+
+PIPELINE_DONE = object()
+
+def pipeline_stage(name: str, work, inbox, outboxes, busy, errors):
+    """Thread body: apply `work` to each batch from `inbox` and forward the
+    result. After any failure batches are drained without work so upstream
+    stages never block on a full queue."""
+    while True:
+        batch = inbox.get()
+        if batch is PIPELINE_DONE:
+            break
+        if errors:
+            continue
+        started = time.perf_counter()
+        try:
+            result = work(batch)
+        except Exception as exc:
+            errors.append((name, exc))
+            continue
+        busy[name] += time.perf_counter() - started
+        for q in outboxes:
+            q.put(result)
+    for q in outboxes:
+        q.put(PIPELINE_DONE)
+
+def run_pipeline(args):
+    """Chunk -> embed -> Mongo/FAISS over bounded in-memory queues. Stages run
+    in their own threads, so device N is written while device N+1 is chunked.
+    With FAISS selected each unique body is embedded once and the vectors are
+    shared with the Mongo writer."""
+    import queue
+    import threading
+
+    embedder = None
+    if args.dump_vector:
+        index_cls = vector_index_class(args)
+        embedder = make_embedder(args.embedding_model)
+    # content_hash -> vector; written by the embed stage before a batch is passed on
+    vectors = {}
+    store = open_mongo_store(args) if args.mongo_dump else None
+    contents = ContentStore(keep_bodies=False) if args.dedup else None
+    faiss_state = {"index": None}
+
+    def embed(batch):
+        _, chunks = batch
+        fresh = {}
+        for c in chunks:
+            if c.content_hash not in vectors:
+                fresh.setdefault(c.content_hash, c.content)
+        if fresh:
+            for digest, vec in zip(fresh, embedder.embed_documents(list(fresh.values()))):
+                vectors[digest] = vec
+        return batch
+
+    def write_mongo(batch):
+        device, chunks = batch
+        push_device_mongo(store, args, device, chunks, vectors if embedder is not None else None)
+
+    def write_faiss(batch):
+        _, chunks = batch
+        docs, ids = faiss_docs(chunks, contents)
+        if not docs:
+            return
+        doc_vectors = [vectors[d.metadata["content_hash"]] for d in docs]
+        if faiss_state["index"] is None:
+            faiss_state["index"] = index_cls.from_embeddings(docs, doc_vectors, embedder=embedder, ids=ids)
+        else:
+            faiss_state["index"].add_embeddings(docs, doc_vectors, ids=ids)
+
+    depth = max(1, args.pipeline_queue)
+    embed_q = queue.Queue(maxsize=depth)
+    sinks = []
+    if store is not None:
+        sinks.append(("mongo", write_mongo, queue.Queue(maxsize=depth)))
+    if embedder is not None:
+        sinks.append(("faiss", write_faiss, queue.Queue(maxsize=depth)))
+
+    busy = {"chunk": 0.0, "embed": 0.0, "mongo": 0.0, "faiss": 0.0}
+    errors = []
+    threads = [threading.Thread(
+        target=pipeline_stage,
+        args=("embed", embed if embedder is not None else (lambda batch: batch), embed_q, [q for _, _, q in sinks], busy, errors),
+        daemon=True
+    )]
+    for name, work, inbox in sinks:
+        threads.append(threading.Thread(target=pipeline_stage, args=(name, work, inbox, [], busy, errors), daemon=True))
+    for t in threads:
+        t.start()
+
+    started = time.perf_counter()
+    batches = iter_device_chunks(args, write=not args.no_chunk_files)
+    try:
+        while not errors:
+            t0 = time.perf_counter()
+            batch = next(batches, None)
+            busy["chunk"] += time.perf_counter() - t0
+            if batch is None:
+                break
+            embed_q.put(batch)
+    finally:
+        embed_q.put(PIPELINE_DONE)
+        for t in threads:
+            t.join()
+        if store is not None:
+            store.close()
+    if errors:
+        name, exc = errors[0]
+        raise SystemExit(f"Pipeline stage '{name}' failed: {exc}")
+
+    if faiss_state["index"] is not None:
+        save_faiss(args, faiss_state["index"], contents)
+    stages = " ".join(f"{name}={busy[name]:.2f}s" for name in busy)
+    print(f"[INFO] Pipeline: wall={time.perf_counter() - started:.2f}s busy {stages} embedded={len(vectors)}")
+
+def find_previous(diff_path: str, device: str):
+    if os.path.isfile(diff_path):
+        return diff_path
+    for ext in (".json", ".cfg"):
+        path = os.path.join(diff_path, device + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def load_previous(path: str, device: str, os_type: str, sizing=None):
+    """Previous version of a device: its chunk JSON file or an older config."""
+    if path.endswith(".json"):
+        return normalize_chunks(load_records(path), device)
+    return build_chunks(device, os_type, read_config(path), sizing=sizing)
+
+def write_delta(delta, out_dir: str) -> str:
+    delta_dir = os.path.join(out_dir, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    path = os.path.join(delta_dir, f"{delta.device}.json")
+    with open(path, "w") as f:
+        json.dump(delta.to_dict(), f, indent=2)
+    return path
+
+def run_diff(args):
+    """Re-chunk configs and diff each device against its previous version
+    (--diff: chunk JSON/config file, or a directory of them by device name)."""
+    if os.path.isfile(args.diff) and not args.config:
+        raise SystemExit("--diff with a single file needs --config for the new version.")
     prepared = prepare_configs(
         config=args.config,
         config_dir=args.config_dir,
@@ -85,103 +595,588 @@ def run_chunking(args) -> str:
         os_map_path=args.os_map,
         detect_os=args.detect_os
     )
+    os.makedirs(args.out_dir, exist_ok=True)
+    deltas = []
     for item in prepared:
-        chunks = convert_config_to_chunks(item["device"], item["os_type"], item["text"], out_dir=out_dir)
-        print(f"[OK] {item['device']}: {len(chunks)} chunks written to {out_dir}")
-    return out_dir
+        device = item["device"]
+        previous = find_previous(args.diff, device)
+        # Load the old version before the new chunk file overwrites it
+        old = load_previous(previous, device, item["os_type"], args.sizing) if previous else []
+        if not previous:
+            print(f"[INFO] {device}: no previous version in {args.diff}, all stanzas are new")
+        new = convert_config_to_chunks(device, item["os_type"], item["text"], out_dir=args.out_dir, sizing=args.sizing)
+        delta = diff_chunks(device, old, new)
+        path = write_delta(delta, args.out_dir)
+        print(f"[DIFF] {format_delta(delta)}")
+        print(f"[OK] {device}: delta written to {path}")
+        deltas.append(delta)
+    return deltas
 
-def run_mongo(args, chunks_dir: str):
+def apply_delta_mongo(store, args, delta):
+    """Mongo side of a ConfigDelta: delete stale chunk_ids, insert (and embed)
+    changed chunks, refresh chunk_index for moved ones. No per-device read."""
+    chunks_collection = f"{args.collection}_chunks"
+    embed = args.embed and not args.dedup
+    # Upsert ids are deleted too, so re-applying a delta (watch retry) does not duplicate chunks
+    stale = list(delta.deletes) + [c.chunk_id for c in delta.upserts]
+    if stale:
+        store.delete_many(chunks_collection, {"device": delta.device, "chunk_id": {"$in": stale}})
+    embeddings = embed_chunks(delta.upserts, args.embedding_model) if embed and delta.upserts else None
+    store.insert_many(chunks_collection, [
+        chunk_doc(c, embeddings[i] if embeddings is not None else None, with_content=not args.dedup)
+        for i, c in enumerate(delta.upserts)
+    ])
+    store.bulk_update(chunks_collection, [
+        ({"device": delta.device, "chunk_id": c.chunk_id}, {"$set": {"chunk_index": c.chunk_index}})
+        for c in delta.moved
+    ])
+    counts = {"added": len(delta.upserts), "removed": len(delta.deletes), "reindexed": len(delta.moved)}
+    if args.dedup:
+        counts["new_bodies"] = sync_contents(store, args, delta.upserts)
+        released = [c.content_hash for s in delta.removed for c in s.chunks] + \
+            [c.content_hash for old, _ in delta.modified for c in old.chunks]
+        counts["pruned_bodies"] = prune_contents(store, args, released)
+    return counts
+
+def open_mongo_store(args):
     if __package__ is None or __package__ == "":
         from netconfig.utils.mongo_writer import MongoStore
     else:
         from .utils.mongo_writer import MongoStore
-    files = collect_chunk_files(chunks_dir)
-    store = MongoStore(mongo_uri=args.mongo_uri, mongo_db=args.mongo_db, dry_run=args.dry_run)
-    devices_collection = args.collection
-    chunks_collection = f"{args.collection}_chunks"
+    return MongoStore(mongo_uri=args.mongo_uri, mongo_db=args.mongo_db, dry_run=args.dry_run)
+
+def run_mongo_delta(args, deltas, store=None):
+    owned = store is None
+    store = store or open_mongo_store(args)
+    for delta in deltas:
+        device_doc = {"updated_at": datetime.utcnow()}
+        if delta.os_type:
+            device_doc["os_type"] = delta.os_type
+        store.upsert(args.collection, {"_id": delta.device}, device_doc)
+        counts = apply_delta_mongo(store, args, delta)
+        summary = ", ".join(f"{k}={v}" for k, v in counts.items())
+        prefix = "[DRY-RUN]" if store.dry_run else "[OK]"
+        print(f"{prefix} {delta.device}: delta applied ({summary}, embed={bool(args.embed)})")
+    if owned:
+        store.close()
+
+def rechunk_device(path: str, out_dir: str, os_type=None, os_map=None, detect_os=False, sizing=None):
+    """Watch worker: re-chunk one config and diff it against its chunk file.
+    Returns (delta, new chunks); new is None for a deleted config (the delta
+    removes all of the device's chunks). Nothing is written here: the chunk
+    file is only replaced by `commit_device` once Mongo/FAISS took the delta."""
+    device = os.path.splitext(os.path.basename(path))[0]
+    chunk_path = os.path.join(out_dir, f"{device}.json")
+    old = normalize_chunks(load_records(chunk_path), device) if os.path.isfile(chunk_path) else []
+    if not os.path.isfile(path):
+        return diff_chunks(device, old, []), None
+    item = prepare_configs(config=path, os_type=os_type, os_map_path=os_map, detect_os=detect_os)[0]
+    new = build_chunks(device, item["os_type"], item["text"], sizing=sizing)
+    return diff_chunks(device, old, new), new
+
+def commit_device(out_dir: str, device: str, chunks):
+    """Write (or, for a deleted config, remove) a device's chunk and xref files."""
+    if chunks is not None:
+        write_chunks(device, chunks, out_dir)
+        return
+    for stale in (os.path.join(out_dir, f"{device}.json"), xref_path(out_dir, device)):
+        if os.path.isfile(stale):
+            os.remove(stale)
+
+class WatchStats:
+    def __init__(self):
+        self.processed = 0
+        self.errors = 0
+        self.lags = deque(maxlen=1000)
+        self.started = time.time()
+
+    def record(self, lag_s: float):
+        self.processed += 1
+        self.lags.append(lag_s)
+
+    def snapshot(self, debouncer, in_flight: int):
+        now = time.monotonic()
+        oldest = min((first for first, _ in debouncer.pending.values()), default=None)
+        lags = list(self.lags)
+        return {
+            "queue_depth": len(debouncer),
+            "in_flight": in_flight,
+            "processed": self.processed,
+            "errors": self.errors,
+            "oldest_pending_s": round(max(now - oldest, 0.0), 2) if oldest is not None else 0.0,
+            "lag_s": {
+                "last": round(lags[-1], 3) if lags else 0.0,
+                "p50": round(percentile(lags, 50), 3),
+                "p95": round(percentile(lags, 95), 3),
+                "max": round(max(lags), 3) if lags else 0.0,
+            },
+            "uptime_s": round(time.time() - self.started, 1),
+        }
+
+def stale_configs(config_dir: str, out_dir: str):
+    """Configs with no chunk file, or modified after it was written, and chunk
+    files whose config is gone (a delete not yet applied)."""
+    stale = []
+    configs = set()
+    for name in sorted(os.listdir(config_dir)):
+        if not name.endswith(".cfg"):
+            continue
+        configs.add(name)
+        chunk_path = os.path.join(out_dir, os.path.splitext(name)[0] + ".json")
+        if not os.path.isfile(chunk_path) or \
+                os.path.getmtime(os.path.join(config_dir, name)) > os.path.getmtime(chunk_path):
+            stale.append(name)
+    for chunk_name in sorted(os.listdir(out_dir)) if os.path.isdir(out_dir) else []:
+        name = os.path.splitext(chunk_name)[0] + ".cfg"
+        if chunk_name.endswith(".json") and name not in configs:
+            stale.append(name)
+    return stale
+
+def report_watch(args, stats, debouncer, in_flight: int):
+    snap = stats.snapshot(debouncer, in_flight)
+    print(
+        f"[WATCH] queue={snap['queue_depth']} in_flight={snap['in_flight']} processed={snap['processed']} "
+        f"errors={snap['errors']} lag_p50={snap['lag_s']['p50']}s lag_p95={snap['lag_s']['p95']}s "
+        f"oldest_pending={snap['oldest_pending_s']}s"
+    )
+    if args.watch_status:
+        tmp = args.watch_status + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(snap, f, indent=2)
+        os.replace(tmp, args.watch_status)
+
+def stop_watch(signum, frame):
+    raise KeyboardInterrupt
+
+def init_pool_worker():
+    """ProcessPoolExecutor initializer: forked workers would inherit the
+    parent's stop_watch handler and print a KeyboardInterrupt traceback on
+    a process-group SIGTERM. The parent stops the pool; workers ignore
+    Ctrl-C and exit quietly on SIGTERM."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+def run_watch(args):
+    """Daemon: re-chunk configs in --config-dir as they change (debounced,
+    bounded process pool) and push deltas to Mongo/FAISS when selected."""
+    from concurrent.futures import ProcessPoolExecutor
+    if __package__ is None or __package__ == "":
+        from netconfig.utils.watcher import Debouncer, make_watcher
+    else:
+        from .utils.watcher import Debouncer, make_watcher
+
+    config_dir = args.config_dir
+    os.makedirs(args.out_dir, exist_ok=True)
+    watcher = make_watcher(config_dir, poll_interval=args.watch_poll_interval, polling=args.watch_polling)
+    debouncer = Debouncer(args.watch_debounce)
+    stats = WatchStats()
+    store = open_mongo_store(args) if args.mongo_dump else None
+    workers = args.watch_workers or min(4, os.cpu_count() or 1)
+    in_flight = {}
+
+    # Catch up on configs that changed while the daemon was down
+    for name in stale_configs(config_dir, args.out_dir):
+        debouncer.touch(name, time.monotonic() - args.watch_debounce)
+
+    signal.signal(signal.SIGTERM, stop_watch)
+    print(f"[INFO] Watching {config_dir} ({type(watcher).__name__}, workers={workers}, debounce={args.watch_debounce}s)")
+    last_report = time.monotonic()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_pool_worker) as pool:
+            while True:
+                changed = watcher.poll(0.1 if (in_flight or len(debouncer)) else 1.0)
+                if changed is None:
+                    print("[WARN] Watch events overflowed; rescanning")
+                    changed = {name for name in os.listdir(config_dir) if name.endswith(".cfg")}
+                for name in changed:
+                    debouncer.touch(name)
+
+                # Bounded: never more than `workers` files in flight, one per device
+                busy = {name for name, _ in in_flight.values()}
+                for name, first in debouncer.ready(limit=workers - len(in_flight), skip=busy):
+                    future = pool.submit(
+                        rechunk_device, os.path.join(config_dir, name), args.out_dir,
+                        args.os_type, args.os_map, args.detect_os, args.sizing
+                    )
+                    in_flight[future] = (name, first)
+
+                done = []
+                for future in [f for f in in_flight if f.done()]:
+                    name, first = in_flight.pop(future)
+                    try:
+                        delta, chunks = future.result()
+                    except Exception as exc:
+                        stats.errors += 1
+                        print(f"[WARN] {name}: re-chunk failed: {exc}")
+                        continue
+                    stats.record(time.monotonic() - first)
+                    print(f"[DIFF] {format_delta(delta).splitlines()[0]}")
+                    done.append((name, delta, chunks))
+
+                deltas = [delta for _, delta, _ in done if not delta.is_empty()]
+                try:
+                    if deltas and store is not None:
+                        run_mongo_delta(args, deltas, store)
+                    if deltas and args.dump_vector:
+                        run_faiss_delta(args, deltas)
+                except Exception as exc:
+                    # Chunk files still hold the old version, so the same deltas
+                    # are recomputed on retry (or by stale_configs after a restart)
+                    stats.errors += 1
+                    print(f"[WARN] applying {len(deltas)} delta(s) failed: {exc}; retrying in {WATCH_SINK_RETRY:.0f}s")
+                    for name, _, _ in done:
+                        debouncer.touch(name, time.monotonic() + WATCH_SINK_RETRY)
+                    done = []
+                for name, delta, chunks in done:
+                    commit_device(args.out_dir, delta.device, chunks)
+
+                if time.monotonic() - last_report >= args.watch_report_interval:
+                    report_watch(args, stats, debouncer, len(in_flight))
+                    last_report = time.monotonic()
+    except KeyboardInterrupt:
+        print("[INFO] Watch stopped")
+    finally:
+        report_watch(args, stats, debouncer, len(in_flight))
+        watcher.close()
+        if store is not None:
+            store.close()
+
+def run_faiss_delta(args, deltas):
+    """Patch an existing FAISS index with deltas (plain or --dedup layout);
+    builds from scratch if there is no index yet."""
+    index_cls = vector_index_class(args)
+    if not index_cls.exists(args.faiss_dir):
+        print(f"[INFO] No {args.vector_backend} index at {args.faiss_dir}; building from {args.out_dir}")
+        run_faiss(args, args.out_dir)
+        return
+
+    index = index_cls.load(args.faiss_dir, args.embedding_model)
+    refs = load_refs(args.faiss_dir)
+    stored = index.ids()
+    deletes, docs, ids, updates = [], [], [], {}
+    moved = shifted = 0
+    for delta in deltas:
+        moved += len(delta.moved)
+        shifted += len(delta.shifted)
+        if refs is None:
+            # Upserts already stored: a retried delta replaces them
+            deletes.extend(cid for cid in list(delta.deletes) + [c.chunk_id for c in delta.upserts] if cid in stored)
+            for c in delta.upserts:
+                docs.append(Document(page_content=c.content, metadata=c.metadata()))
+                ids.append(c.chunk_id)
+            # Index metadata keeps spans, so shifted chunks are updated too
+            for c in delta.moved + delta.shifted:
+                updates[c.chunk_id] = {k: v for k, v in c.metadata().items() if k in POSITION_FIELDS}
+            continue
+        new_bodies, orphaned = apply_refs_delta(refs, delta)
+        deletes.extend(digest for digest in orphaned if digest in stored)
+        for digest, c in new_bodies.items():
+            meta = {"content_hash": digest, "section_type": c.section_type,
+                    "chunk_type": c.chunk_type, "section": c.section}
+            docs.append(Document(page_content=c.content, metadata=meta))
+            ids.append(digest)
+    if deletes:
+        index.delete_ids(deletes)
+    if docs:
+        index.add_documents(docs, ids=ids)
+    index.update_metadata(updates)
+    index.save(args.faiss_dir)
+    if refs is not None:
+        save_refs(refs, args.faiss_dir)
+    print(f"[DONE] {type(index).__name__} patched at {args.faiss_dir} (added={len(docs)}, deleted={len(deletes)}, moved={moved}, shifted={shifted})")
+
+def job_stages(args):
+    """Per-device stages for --job, in order."""
+    stages = ["chunk"]
+    if args.dump_vector or (args.mongo_dump and args.embed):
+        stages.append("embed")
+    if args.mongo_dump:
+        stages.append("mongo")
+    return stages
+
+def file_signature(path: str) -> str:
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def open_job_queue(args):
+    if __package__ is None or __package__ == "":
+        from netconfig.utils.job_queue import JobQueue
+    else:
+        from .utils.job_queue import JobQueue
+    return JobQueue(os.path.join(args.job, JOB_DB), lease=args.job_lease,
+                    max_attempts=args.job_max_attempts, backoff=args.job_backoff)
+
+def job_vectors_path(args, device: str) -> str:
+    return os.path.join(args.job, JOB_VECTOR_DIR, f"{device}.npz")
+
+def save_job_vectors(path: str, vectors):
+    import numpy as np
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path[:-len(".npz")] + ".tmp.npz"
+    matrix = np.asarray(list(vectors.values()), dtype=np.float32)
+    np.savez(tmp, hashes=np.array(list(vectors), dtype=str), vectors=matrix)
+    os.replace(tmp, path)
+
+def load_job_vectors(path: str):
+    import numpy as np
+    with np.load(path) as data:
+        return {str(h): v.tolist() for h, v in zip(data["hashes"], data["vectors"])}
+
+def init_job(args, queue):
+    """Queue every config (idempotent, safe to run from several hosts).
+    Changed configs and devices missing a now-selected stage are requeued."""
+    files, archives = list_config_inputs(args.config, args.config_dir)
+    if archives:
+        print(f"[WARN] --job queues .cfg files only; skipping {len(archives)} archive(s)")
+    added = {"new": 0, "changed": 0, "same": 0}
+    queue.remove(LEGACY_FAISS_TASK, "faiss")
     for path in files:
         device = os.path.splitext(os.path.basename(path))[0]
-        chunks = normalize_chunks(load_chunks(path), device)
-        os_type = chunks[0].get("metadata", {}).get("os_type") if chunks else None
-        embeddings = embed_chunks(chunks, args.embedding_model) if args.embed else None
+        added[queue.add(device, "device", os.path.abspath(path), file_signature(path))] += 1
+    removed = queue.remove_missing("device")
+    store = open_mongo_store(args) if removed and args.mongo_dump else None
+    for device in removed:
+        commit_device(args.out_dir, device, None)
+        if os.path.isfile(job_vectors_path(args, device)):
+            os.remove(job_vectors_path(args, device))
+        if store is not None:
+            released = [d.get("content_hash") for d in store.find(f"{args.collection}_chunks", {"device": device}, {"content_hash": 1})]
+            store.delete_many(f"{args.collection}_chunks", {"device": device})
+            store.delete_one(args.collection, {"_id": device})
+            if args.dedup:
+                prune_contents(store, args, released)
+    if store is not None:
+        store.close()
+    requeued = queue.require_stages("device", job_stages(args))
+    retried = queue.retry_failed() if args.job_retry_failed else 0
+    if args.dump_vector:
+        if queue.add(FAISS_TASK, "faiss") == "same" and (added["new"] or added["changed"] or retried or removed):
+            queue.reopen(FAISS_TASK)
+    print(
+        f"[JOB] {args.job}: new={added['new']} changed={added['changed']} unchanged={added['same']} "
+        f"removed={len(removed)} requeued={requeued} retried={retried} stages={','.join(job_stages(args))}"
+    )
 
-        device_doc = {"updated_at": datetime.utcnow()}
-        if os_type:
-            device_doc["os_type"] = os_type
-        store.upsert(devices_collection, {"_id": device}, device_doc)
-
-        store.delete_many(chunks_collection, {"device": device})
-        docs = []
-        for i, c in enumerate(chunks):
-            meta = c.get("metadata", {})
-            doc = {
-                "device": meta.get("device", device),
-                "os_type": meta.get("os_type"),
-                "section": meta.get("section"),
-                "section_type": meta.get("section_type"),
-                "chunk_type": meta.get("chunk_type"),
-                "chunk_index": meta.get("chunk_index"),
-                "chunk_id": meta.get("chunk_id"),
-                "content": c.get("content", ""),
-                "created_at": datetime.utcnow()
-            }
-            if embeddings is not None:
-                doc["embedding"] = embeddings[i]
-            docs.append(doc)
-        store.insert_many(chunks_collection, docs)
-
-        if store.dry_run:
-            print(f"[DRY-RUN] {device}: {len(chunks)} chunks ready (embed={bool(args.embed)})")
+def run_job_device(args, queue, task, worker: str, store=None, embedder=None):
+    """Run the stages of one device that have no checkpoint yet."""
+    device = task.name
+    stages = job_stages(args)
+    done = queue.done_stages(device)
+    chunk_path = os.path.join(args.out_dir, f"{device}.json")
+    if "chunk" in done and os.path.isfile(chunk_path):
+        chunks = normalize_chunks(load_records(chunk_path), device)
+    else:
+        item = prepare_configs(config=task.source, os_type=args.os_type, os_map_path=args.os_map, detect_os=args.detect_os)[0]
+        chunks = build_chunks(device, item["os_type"], item["text"], sizing=args.sizing)
+        write_chunks(device, chunks, args.out_dir)
+        queue.checkpoint(task, "chunk", worker)
+
+    vectors = None
+    if "embed" in stages:
+        path = job_vectors_path(args, device)
+        if "embed" in done and os.path.isfile(path):
+            vectors = load_job_vectors(path)
         else:
-            print(f"[OK] {device}: {len(chunks)} chunks stored (embed={bool(args.embed)})")
-    store.close()
+            unique = {}
+            for c in chunks:
+                unique.setdefault(c.content_hash, c.content)
+            vectors = dict(zip(unique, embedder.embed_documents(list(unique.values())))) if unique else {}
+            save_job_vectors(path, vectors)
+            queue.checkpoint(task, "embed", worker)
 
-def run_faiss(args, chunks_dir: str):
-    try:
-        from langchain.schema import Document
-    except Exception:
-        raise SystemExit("langchain is required for FAISS. Install langchain.")
+    if "mongo" in stages and "mongo" not in done:
+        push_device_mongo(store, args, device, chunks, vectors)
+        if not store.dry_run:
+            queue.checkpoint(task, "mongo", worker)
+    print(f"[OK] {device}: {len(chunks)} chunks ({','.join(s for s in stages if s not in done) or 'all stages checkpointed'})")
 
+def run_job_faiss(args, queue, embedder):
+    """Build the FAISS index from every finished device's chunk file and
+    checkpointed vectors; nothing is embedded again."""
     if __package__ is None or __package__ == "":
-        from netconfig.utils.faiss_index import FaissIndex
+        from netconfig.utils.job_queue import DONE, FAILED
     else:
-        from .utils.faiss_index import FaissIndex
+        from .utils.job_queue import DONE, FAILED
+    failed = queue.names("device", FAILED)
+    if failed:
+        print(f"[WARN] FAISS index leaves out {len(failed)} failed device(s): {', '.join(failed[:10])}")
+    docs, ids, doc_vectors = [], [], []
+    contents = ContentStore(keep_bodies=False) if args.dedup else None
+    for device in queue.names("device", DONE):
+        chunks = normalize_chunks(load_records(os.path.join(args.out_dir, f"{device}.json")), device)
+        vectors = load_job_vectors(job_vectors_path(args, device))
+        device_docs, device_ids = faiss_docs(chunks, contents)
+        docs.extend(device_docs)
+        ids.extend(device_ids)
+        doc_vectors.extend(vectors[d.metadata["content_hash"]] for d in device_docs)
+    if not docs:
+        print("[WARN] No chunks to index; FAISS index not written")
+        return
+    save_faiss(args, vector_index_class(args).from_embeddings(docs, doc_vectors, embedder=embedder, ids=ids), contents)
 
-    docs = []
-    for path in collect_chunk_files(chunks_dir):
-        for c in load_chunks(path):
-            docs.append(Document(page_content=c["content"], metadata=c.get("metadata", {})))
-    index = FaissIndex.from_documents(docs, args.embedding_model)
-    os.makedirs(args.faiss_dir, exist_ok=True)
-    index.save(args.faiss_dir)
-    print(f"[DONE] FAISS index created at {args.faiss_dir}")
+def job_worker(args):
+    """Claim devices from the shared queue until none are left, then (once all
+    devices are finished) the FAISS build. Returns (completed, failed)."""
+    import socket
+    if __package__ is None or __package__ == "":
+        from netconfig.utils.job_queue import PENDING, RUNNING, LeaseLost
+    else:
+        from .utils.job_queue import PENDING, RUNNING, LeaseLost
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    queue = open_job_queue(args)
+    stages = job_stages(args)
+    store = open_mongo_store(args) if "mongo" in stages else None
+    embedder = None
+    if "embed" in stages:
+        embedder = make_embedder(args.embedding_model)
+
+    # Release the claimed task on SIGTERM or Ctrl-C (pool workers ignore SIGINT until here)
+    previous = {sig: signal.signal(sig, stop_watch) for sig in (signal.SIGTERM, signal.SIGINT)}
+    completed = failed = 0
+    task = None
+    try:
+        while True:
+            counts = queue.counts("device")
+            devices_open = counts[PENDING] or counts[RUNNING]
+            task = queue.claim(worker, "device") if devices_open else None
+            if task is None and not devices_open and args.dump_vector:
+                task = queue.claim(worker, "faiss")
+            if task is None:
+                wake = queue.next_wakeup("device" if devices_open else "faiss")
+                if wake is None:
+                    break
+                time.sleep(min(max(wake - time.time(), 0.5), args.job_poll))
+                continue
+            try:
+                with queue.keep_alive(task, worker):
+                    if task.kind == "faiss":
+                        run_job_faiss(args, queue, embedder)
+                    else:
+                        run_job_device(args, queue, task, worker, store, embedder)
+                if queue.complete(task, worker):
+                    completed += 1
+                else:
+                    print(f"[WARN] {task.name}: lease lost to another worker; result dropped")
+            except LeaseLost:
+                print(f"[WARN] {task.name}: lease lost to another worker; result dropped")
+            except (Exception, SystemExit) as exc:
+                # SystemExit: per-device input errors (e.g. unresolved os_type)
+                status = queue.fail(task, worker, f"{type(exc).__name__}: {exc}")
+                if status is None:
+                    print(f"[WARN] {task.name}: attempt {task.attempts} failed ({exc}) after its lease was lost")
+                else:
+                    failed += status != PENDING
+                    print(f"[WARN] {task.name}: attempt {task.attempts} failed ({exc}); now {status}")
+            task = None
+    except KeyboardInterrupt:
+        if task is not None:
+            queue.release(task, worker)
+        print(f"[INFO] Worker {worker} stopped")
+    finally:
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+        queue.close()
+        if store is not None:
+            store.close()
+    return completed, failed
+
+def report_job(queue):
+    for kind in ("device", "faiss"):
+        counts = queue.counts(kind)
+        if any(counts.values()):
+            print(f"[JOB] {kind}: " + " ".join(f"{status}={n}" for status, n in counts.items()))
+    for name, attempts, error in queue.failures():
+        print(f"[JOB] failed {name} after {attempts} attempt(s): {error}")
+
+def run_job(args):
+    """Resumable, sharded run over a shared work queue in --job DIR. Start the
+    same command on any number of hosts sharing DIR (and --out-dir); each runs
+    --job-workers processes that claim devices until the queue is drained."""
+    from concurrent.futures import ProcessPoolExecutor
+    os.makedirs(args.job, exist_ok=True)
+    os.makedirs(args.out_dir, exist_ok=True)
+    queue = open_job_queue(args)
+    try:
+        if not args.job_status:
+            init_job(args, queue)
+            workers = max(1, args.job_workers)
+            if workers == 1:
+                job_worker(args)
+            else:
+                previous = signal.signal(signal.SIGTERM, stop_watch)
+                try:
+                    with ProcessPoolExecutor(max_workers=workers, initializer=init_pool_worker) as pool:
+                        futures = [pool.submit(job_worker, args) for _ in range(workers)]
+                        for future in futures:
+                            future.result()
+                except KeyboardInterrupt:
+                    # Workers got the same signal; leaving the pool waits until they released their tasks
+                    print("[INFO] Job stopped")
+                finally:
+                    signal.signal(signal.SIGTERM, previous)
+        report_job(queue)
+    finally:
+        queue.close()
 
 def main():
     argp = argparse.ArgumentParser(description="NetConfig: chunk configs and enable optional outputs via flags.")
     argp.add_argument("--config", help="Path to a single config file")
-    argp.add_argument("--config-dir", default=DEFAULT_CONFIG_DIR, help="Directory of .cfg files")
+    argp.add_argument("--config-dir", default=DEFAULT_CONFIG_DIR, help="Directory of .cfg files and config archives")
     argp.add_argument("--os-type", help="OS type (ios, iosxe, iosxr, nxos, eos)")
     argp.add_argument("--os-map", help="JSON map of filename/device -> os_type")
     argp.add_argument("--detect-os", action="store_true", help="Auto-detect OS type when not provided")
+    argp.add_argument("--archive-workers", type=int, default=None, help="Processes for reading config archives in parallel (default: CPUs)")
     argp.add_argument("--out-dir", default=DEFAULT_CHUNK_DIR, help="Output directory for chunks")
+    argp.add_argument("--token-chunking", action="store_true", help="Size chunks by tokens (tiktoken) instead of characters")
+    argp.add_argument("--chunk-tokens", type=int, default=None, help="Max tokens per chunk (default: per embedding model)")
+    argp.add_argument("--chunk-overlap-tokens", type=int, default=None, help="Token overlap between split pieces")
+    argp.add_argument("--size-report", action="store_true", help="Print chunk size distribution vs target")
+    argp.add_argument("--hierarchical", action="store_true", help="Split oversized stanzas along their indentation tree")
+    argp.add_argument("--watch", action="store_true", help="Daemon: re-chunk configs in --config-dir as they change")
+    argp.add_argument("--watch-debounce", type=float, default=2.0, help="Seconds a file must be quiet before re-chunking")
+    argp.add_argument("--watch-workers", type=int, default=None, help="Worker processes for re-chunking (default: min(4, CPUs))")
+    argp.add_argument("--watch-polling", action="store_true", help="Poll the directory instead of using inotify")
+    argp.add_argument("--watch-poll-interval", type=float, default=2.0, help="Polling interval in seconds")
+    argp.add_argument("--watch-status", help="Write queue depth / lag metrics JSON to this path")
+    argp.add_argument("--watch-report-interval", type=float, default=30.0, help="Seconds between [WATCH] metric lines")
+    argp.add_argument("--pipeline", action="store_true", help="Stream chunks through in-memory queues to embedding and sinks")
+    argp.add_argument("--pipeline-queue", type=int, default=4, help="Max device batches buffered between pipeline stages")
+    argp.add_argument("--no-chunk-files", action="store_true", help="Skip writing chunk JSON files (only with --pipeline)")
+    argp.add_argument("--job", metavar="DIR", help="Resumable job mode: shared work queue and checkpoints in DIR")
+    argp.add_argument("--job-workers", type=int, default=1, help="Worker processes on this host for --job")
+    argp.add_argument("--job-status", action="store_true", help="Print --job queue status and exit")
+    argp.add_argument("--job-retry-failed", action="store_true", help="Requeue devices that used up their attempts")
+    argp.add_argument("--job-max-attempts", type=int, default=5, help="Attempts per device before it is marked failed")
+    argp.add_argument("--job-backoff", type=float, default=30.0, help="Initial retry delay in seconds (doubles per attempt)")
+    argp.add_argument("--job-lease", type=float, default=600.0, help="Seconds a claimed device is held before other workers may take it over")
+    argp.add_argument("--job-poll", type=float, default=5.0, help="Max seconds between queue polls while waiting")
+    argp.add_argument("--diff", help="Previous chunk JSON/config (or a directory of them): emit and apply only changed stanzas")
 
     argp.add_argument("--mongo-dump", "--dump-mongo", action="store_true", help="Write chunks to MongoDB")
     argp.add_argument("--mongo-db", default=None, help="Mongo database name")
     argp.add_argument("--collection", "--mongo-collection", default=None, help="Base collection name (chunks stored in <name>_chunks)")
     argp.add_argument("--embed", action="store_true", help="Create embeddings (Mongo and/or FAISS)")
     argp.add_argument("--dry-run", action="store_true", help="Preview Mongo writes without writing")
+    argp.add_argument("--dedup", action="store_true", help="Store/embed/index each unique chunk body once fleet-wide")
 
-    argp.add_argument("--dump-vector", action="store_true", help="Build FAISS index from chunks")
-    argp.add_argument("--faiss-dir", default=DEFAULT_FAISS_DIR, help="FAISS output directory")
+    argp.add_argument("--dump-vector", action="store_true", help="Build a vector index (FAISS by default) from chunks")
+    argp.add_argument("--vector-backend", choices=VECTOR_BACKENDS, default="faiss", help="Vector index: faiss (langchain FAISS) or numpy (exact search, mmap'd .npy)")
+    argp.add_argument("--faiss-dir", default=DEFAULT_FAISS_DIR, help="Vector index output directory")
     argp.add_argument("--embedding-model", default=None, help="Embedding model name")
 
     args = argp.parse_args()
+    if args.pipeline and args.diff:
+        argp.error("--pipeline rebuilds every device; it cannot be combined with --diff")
 
     app_config = load_app_config()
     mongo_cfg = app_config.get("mongo", {}) if isinstance(app_config.get("mongo", {}), dict) else {}
     args.mongo_db = args.mongo_db or mongo_cfg.get("db") or "net_config"
     args.collection = args.collection or mongo_cfg.get("collection") or "network_config"
     args.mongo_uri = mongo_cfg.get("uri") or DEFAULT_MONGO_URI
+    chunk_cfg = app_config.get("chunking", {}) if isinstance(app_config.get("chunking", {}), dict) else {}
+    args.sizing = build_sizing(args, chunk_cfg)
+    # Report against the budget chunks were actually sized to (chars or tokens)
+    args.size_report_sizing = args.sizing or CharSizing()
 
     if args.embed and not (args.mongo_dump or args.dump_vector):
         print("[WARN] --embed set but no output selected. Use --mongo-dump and/or --dump-vector.")
@@ -189,6 +1184,32 @@ def main():
     if args.mongo_dump and not args.mongo_uri and not args.dry_run:
         raise SystemExit("Missing MongoDB URI. Set it in config.yaml.")
 
+    if args.watch:
+        if args.config:
+            raise SystemExit("--watch monitors --config-dir; it cannot be combined with --config.")
+        reject_archives(args, "--watch")
+        run_watch(args)
+        return
+
+    if args.job:
+        run_job(args)
+        return
+
+    if args.pipeline:
+        run_pipeline(args)
+        return
+    if args.no_chunk_files:
+        print("[WARN] --no-chunk-files only applies with --pipeline; chunk files are still written.")
+
+    if args.diff:
+        reject_archives(args, "--diff")
+        deltas = run_diff(args)
+        if args.mongo_dump:
+            run_mongo_delta(args, deltas)
+        if args.dump_vector:
+            run_faiss_delta(args, deltas)
+        return
+
     # Always chunk from configs first (default behavior)
     chunks_dir = run_chunking(args)
 
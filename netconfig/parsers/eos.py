@@ -1,4 +1,5 @@
 from ..core.chunk_builder import build_section_regex, chunk_config
+from ..core.xref import build_xref_regexes
 
 NAME = "eos"
 
@@ -29,11 +30,42 @@ SECTION_START_REGEX = build_section_regex(SECTION_START_PATTERNS)
 COMMENT_PREFIXES = ["!"]
 IGNORE_LINES = {"end"}
 
-def chunk(device, text):
+# Named objects for the cross-reference index (see core/xref.py)
+XREF_DEFINITIONS = [
+    ("route-map", r"^route-map\s+(?P<name>\S+)"),
+    ("prefix-list", r"^ip(?:v6)?\s+prefix-list\s+(?P<name>\S+)"),
+    ("community-list", r"^ip\s+(?:extcommunity|community)-list\s+(?:standard\s+|expanded\s+|regexp\s+)?(?P<name>\S+)"),
+    ("as-path-list", r"^ip\s+as-path\s+access-list\s+(?P<name>\S+)"),
+    ("acl", r"^ip(?:v6)?\s+access-list\s+(?:standard\s+|extended\s+)?(?P<name>\S+)"),
+    ("acl", r"^access-list\s+(?P<name>\S+)"),
+    ("vrf", r"^vrf\s+(?:instance|definition)\s+(?P<name>\S+)"),
+]
+
+XREF_REFERENCES = [
+    ("route-map", r"\broute-map\s+(?P<name>\S+)"),
+    ("route-map", r"\btable-map\s+(?P<name>\S+)"),
+    ("prefix-list", r"\bprefix-list\s+(?P<name>\S+)"),
+    ("prefix-list", r"^\s*match\s+ip(?:v6)?\s+\S+\s+prefix-list\s+(?P<name>.+)$"),
+    ("acl", r"^\s*match\s+ip(?:v6)?\s+address\s+(?!prefix-list)(?P<name>.+)$"),
+    ("acl", r"\baccess-group\s+(?:name\s+)?(?P<name>\S+)"),
+    ("acl", r"\baccess-class\s+(?P<name>\S+)"),
+    ("acl", r"\bdistribute-list\s+(?!prefix|route-map|gateway)(?P<name>\S+)"),
+    ("community-list", r"^\s*match\s+(?:ext)?community\s+(?P<name>.+)$"),
+    ("community-list", r"\bset\s+comm-list\s+(?P<name>\S+)"),
+    ("as-path-list", r"^\s*match\s+as-path\s+(?P<name>.+)$"),
+    ("as-path-list", r"\bfilter-list\s+(?P<name>\S+)"),
+    ("vrf", r"\bvrf\s+(?:forwarding\s+)?(?P<name>\S+)"),
+]
+
+XREF_DEFINITION_REGEXES = build_xref_regexes(XREF_DEFINITIONS)
+XREF_REFERENCE_REGEXES = build_xref_regexes(XREF_REFERENCES)
+
+def chunk(device, text, sizing=None):
     return chunk_config(
         device,
         text,
         SECTION_START_REGEX,
         comment_prefixes=COMMENT_PREFIXES,
-        ignore_lines=IGNORE_LINES
+        ignore_lines=IGNORE_LINES,
+        sizing=sizing
     )
@@ -32,11 +32,12 @@ SECTION_START_REGEX = build_section_regex(SECTION_START_PATTERNS)
 COMMENT_PREFIXES = ["!"]
 IGNORE_LINES = {"end"}
 
-def chunk(device, text):
+def chunk(device, text, sizing=None):
     return chunk_config(
         device,
         text,
         SECTION_START_REGEX,
         comment_prefixes=COMMENT_PREFIXES,
-        ignore_lines=IGNORE_LINES
+        ignore_lines=IGNORE_LINES,
+        sizing=sizing
     )
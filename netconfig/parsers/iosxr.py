@@ -1,4 +1,5 @@
 from ..core.chunk_builder import build_section_regex, chunk_config
+from ..core.xref import build_xref_regexes
 
 NAME = "iosxr"
 
@@ -27,11 +28,38 @@ SECTION_START_REGEX = build_section_regex(SECTION_START_PATTERNS)
 COMMENT_PREFIXES = ["!"]
 IGNORE_LINES = set()
 
-def chunk(device, text):
+# Named objects for the cross-reference index (see core/xref.py)
+XREF_DEFINITIONS = [
+    ("route-map", r"^route-policy\s+(?P<name>[^\s(]+)"),
+    ("prefix-list", r"^prefix-set\s+(?P<name>\S+)"),
+    ("community-list", r"^(?:community-set|large-community-set|extcommunity-set\s+\S+)\s+(?P<name>\S+)"),
+    ("as-path-list", r"^as-path-set\s+(?P<name>\S+)"),
+    ("acl", r"^ipv[46]\s+access-list\s+(?P<name>\S+)"),
+    ("vrf", r"^vrf\s+(?P<name>\S+)"),
+]
+
+XREF_REFERENCES = [
+    ("route-map", r"\broute-policy\s+(?P<name>[^\s(]+)"),
+    ("route-map", r"^\s*apply\s+(?P<name>[^\s(]+)"),
+    ("prefix-list", r"\b(?:destination|source|next-hop)\s+in\s+(?P<name>[^\s(]+)"),
+    ("community-list", r"\b(?:large-community|extcommunity\s+\S+|community)\s+matches-(?:any|every|within)\s+(?P<name>[^\s(]+)"),
+    ("community-list", r"\bset\s+(?:large-community|extcommunity\s+\S+|community)\s+(?P<name>[^\s(]+)"),
+    ("community-list", r"\bdelete\s+(?:large-community|extcommunity\s+\S+|community)\s+(?:in\s+|not\s+in\s+)?(?P<name>[^\s(]+)"),
+    ("as-path-list", r"\bas-path\s+in\s+(?P<name>[^\s(]+)"),
+    ("acl", r"\baccess-group\s+(?P<name>\S+)"),
+    ("acl", r"\baccess-class\s+(?:ingress\s+|egress\s+)?(?P<name>\S+)"),
+    ("vrf", r"\bvrf\s+(?P<name>\S+)"),
+]
+
+XREF_DEFINITION_REGEXES = build_xref_regexes(XREF_DEFINITIONS)
+XREF_REFERENCE_REGEXES = build_xref_regexes(XREF_REFERENCES)
+
+def chunk(device, text, sizing=None):
     return chunk_config(
         device,
         text,
         SECTION_START_REGEX,
         comment_prefixes=COMMENT_PREFIXES,
-        ignore_lines=IGNORE_LINES
+        ignore_lines=IGNORE_LINES,
+        sizing=sizing
     )
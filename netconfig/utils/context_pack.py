@@ -0,0 +1,166 @@
+"""Pack retrieved chunks into a token-budgeted prompt context.
+
+Retrieved docs are deduped, split fragments of the same stanza are merged
+back together (dropping the splitter overlap their byte spans show), optional neighbor chunks of
+the same stanza are pulled in, and blocks are added by relevance until the
+token budget is used.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .tokens import count_tokens, truncate_tokens
+
+DEFAULT_CONTEXT_TOKENS = 6000
+
+def span_overlap(left_meta: Dict[str, Any], right_meta: Dict[str, Any]) -> int:
+    """Source bytes two consecutive fragments share (left byte_end - right
+    byte_start); 0 without spans or when they do not overlap."""
+    end, start = left_meta.get("byte_end"), right_meta.get("byte_start")
+    if end is None or start is None:
+        return 0
+    return max(end - start, 0)
+
+def merge_overlap(left: str, right: str, overlap: int = 0) -> str:
+    """Join two consecutive fragments of a split stanza that share `overlap`
+    source bytes (see span_overlap); with no overlap they are joined as is.
+    The shared text is cut from `right` when it matches the end of `left`
+    byte for byte; otherwise (e.g. CRLF sources, stripped edges) the longest
+    run of leading lines of `right` repeated at the end of `left`, compared
+    stripped and no longer than `overlap` bytes, is dropped."""
+    if overlap <= 0:
+        return left + "\n" + right
+    left_bytes = left.encode("utf-8", "surrogateescape")
+    right_bytes = right.encode("utf-8", "surrogateescape")
+    if overlap <= min(len(left_bytes), len(right_bytes)) and left_bytes[-overlap:] == right_bytes[:overlap]:
+        return left + right_bytes[overlap:].decode("utf-8", "surrogateescape")
+    left_lines = left.split("\n")
+    right_lines = right.split("\n")
+    left_stripped = [line.strip() for line in left_lines]
+    right_stripped = [line.strip() for line in right_lines]
+    for n in range(min(len(left_lines), len(right_lines)), 0, -1):
+        if len("\n".join(right_lines[:n]).encode("utf-8", "surrogateescape")) > overlap:
+            continue
+        if left_stripped[-n:] == right_stripped[:n]:
+            return "\n".join(left_lines + right_lines[n:])
+    return left + "\n" + right
+
+def doc_key(meta: Dict[str, Any], content: str):
+    return meta.get("chunk_id") or (meta.get("device"), content)
+
+def stanza_key(meta: Dict[str, Any]):
+    return (meta.get("device"), meta.get("chunk_type"), meta.get("section"))
+
+def build_neighbor_lookup(docs) -> Dict[Tuple[Any, Any], Any]:
+    """(device, chunk_index) -> doc, for neighbor expansion."""
+    return {
+        (d.metadata.get("device"), d.metadata.get("chunk_index")): d
+        for d in docs
+        if d.metadata.get("chunk_index") is not None
+    }
+
+def expand_neighbors(doc, neighbors: int, lookup: Callable):
+    meta = doc.metadata
+    idx = meta.get("chunk_index")
+    if idx is None or neighbors <= 0:
+        return []
+    found = []
+    for step in (-1, 1):
+        for offset in range(1, neighbors + 1):
+            nb = lookup((meta.get("device"), idx + step * offset))
+            # Only adjacent chunks of the same stanza count as neighbors
+            if nb is None or stanza_key(nb.metadata) != stanza_key(meta):
+                break
+            found.append(nb)
+    return found
+
+def common_path(left: Optional[str], right: Optional[str]) -> Optional[str]:
+    """Shared prefix of two hierarchical section paths ("a > b > c")."""
+    if not left or not right:
+        return left or right
+    shared = []
+    for a, b in zip(left.split(" > "), right.split(" > ")):
+        if a != b:
+            break
+        shared.append(a)
+    return " > ".join(shared) or None
+
+def group_blocks(ranked_docs) -> List[Dict[str, Any]]:
+    """Merge runs of consecutive chunk_index within the same stanza.
+    Each block keeps the best (lowest) rank of its members."""
+    by_stanza: Dict[Any, List[Tuple[int, Any]]] = {}
+    for rank, doc in ranked_docs:
+        by_stanza.setdefault(stanza_key(doc.metadata), []).append((rank, doc))
+
+    blocks = []
+    for key, members in by_stanza.items():
+        members.sort(key=lambda m: (m[1].metadata.get("chunk_index") is None, m[1].metadata.get("chunk_index") or 0))
+        current = None
+        for rank, doc in members:
+            idx = doc.metadata.get("chunk_index")
+            if current and idx is not None and current["last_index"] is not None and idx == current["last_index"] + 1:
+                current["text"] = merge_overlap(current["text"], doc.page_content, span_overlap(current["last_meta"], doc.metadata))
+                current["last_index"] = idx
+                current["last_meta"] = doc.metadata
+                current["rank"] = min(current["rank"], rank)
+                current["chunk_ids"].append(doc.metadata.get("chunk_id"))
+                current["path"] = common_path(current["path"], doc.metadata.get("section_path"))
+                continue
+            current = {
+                "device": key[0],
+                "section": key[2] or "global",
+                "path": doc.metadata.get("section_path"),
+                "text": doc.page_content,
+                "last_index": idx,
+                "last_meta": doc.metadata,
+                "rank": rank,
+                "chunk_ids": [doc.metadata.get("chunk_id")],
+            }
+            blocks.append(current)
+    blocks.sort(key=lambda b: b["rank"])
+    return blocks
+
+def pack_context(
+    docs,
+    budget_tokens: int = DEFAULT_CONTEXT_TOKENS,
+    neighbors: int = 0,
+    lookup: Optional[Callable] = None,
+    model: Optional[str] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Return prompt context for `docs` (ordered by relevance) within
+    `budget_tokens`. `lookup((device, chunk_index))` enables neighbors."""
+    seen = set()
+    ranked = []
+    for rank, doc in enumerate(docs):
+        candidates = [doc]
+        if lookup and neighbors:
+            candidates += expand_neighbors(doc, neighbors, lookup)
+        for cand in candidates:
+            key = doc_key(cand.metadata, cand.page_content)
+            if key in seen:
+                continue
+            seen.add(key)
+            ranked.append((rank, cand))
+
+    parts, used, dropped = [], 0, 0
+    for block in group_blocks(ranked):
+        text = f"### {block['device']} :: {block['path'] or block['section']}\n{block['text']}"
+        tokens = count_tokens(text, model)
+        if used + tokens > budget_tokens:
+            if parts:
+                dropped += 1
+                continue
+            # A single oversized top block is truncated rather than dropped
+            text = truncate_tokens(text, budget_tokens, model)
+            tokens = count_tokens(text, model)
+        parts.append(text)
+        used += tokens
+
+    if stats is not None:
+        stats.update({
+            "docs_in": len(docs),
+            "chunks_used": len(ranked),
+            "blocks": len(parts),
+            "blocks_dropped": dropped,
+            "tokens": used,
+        })
+    return "\n\n".join(parts)
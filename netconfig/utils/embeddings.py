@@ -1,16 +1,73 @@
-from typing import List, Dict, Any, Optional
+import re
+import time
+import hashlib
+import math
+from typing import List, Optional
 
 try:
     from langchain.embeddings import OpenAIEmbeddings
 except Exception:
     OpenAIEmbeddings = None
 
-def embed_chunks(chunks: List[Dict[str, Any]], model: Optional[str] = None) -> List[List[float]]:
+try:
+    from langchain.embeddings.base import Embeddings
+except Exception:
+    try:
+        from langchain_core.embeddings import Embeddings
+    except Exception:
+        Embeddings = object
+
+try:
+    from langchain.schema import Document
+except Exception:
+    try:
+        from langchain_core.documents import Document
+    except Exception:
+        class Document:
+            """Minimal stand-in so vector backends work without langchain."""
+
+            def __init__(self, page_content: str, metadata=None):
+                self.page_content = page_content
+                self.metadata = metadata or {}
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9_./:-]+")
+
+def make_embedder(embedding_model: Optional[str] = None):
     if OpenAIEmbeddings is None:
         raise RuntimeError("OpenAIEmbeddings not available. Install langchain and openai.")
     kwargs = {}
-    if model:
-        kwargs["model"] = model
-    embedder = OpenAIEmbeddings(**kwargs)
-    texts = [c["content"] for c in chunks]
-    return embedder.embed_documents(texts)
+    if embedding_model:
+        kwargs["model"] = embedding_model
+    return OpenAIEmbeddings(**kwargs)
+
+def embed_chunks(chunks, model: Optional[str] = None) -> List[List[float]]:
+    texts = [c.content for c in chunks]
+    return make_embedder(model).embed_documents(texts)
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embeddings (hashed tokens) for tests and load runs.
+
+    `latency_ms` is added once per call to mimic a remote embedding API, so
+    batching effects are visible without network access.
+    """
+
+    def __init__(self, dim: int = 256, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency_ms = latency_ms
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for token in TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -1,37 +1,59 @@
+import os
 from typing import List, Optional
 
 from langchain.schema import Document
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import FAISS
 
+from .embeddings import make_embedder
+
 class FaissIndex:
+    supports_filter = False
+
     def __init__(self, store: FAISS, embedder: OpenAIEmbeddings):
         self.store = store
         self.embedder = embedder
 
     @classmethod
-    def from_documents(cls, docs: List[Document], embedding_model: Optional[str] = None):
-        embed_kwargs = {}
-        if embedding_model:
-            embed_kwargs["model"] = embedding_model
-        embedder = OpenAIEmbeddings(**embed_kwargs)
-        store = FAISS.from_documents(docs, embedder)
+    def from_documents(cls, docs: List[Document], embedding_model: Optional[str] = None, embedder=None,
+                       ids: Optional[List[str]] = None):
+        # ids (stable chunk_ids) key the docstore so delete_ids/add_documents can update in place
+        embedder = embedder or make_embedder(embedding_model)
+        store = FAISS.from_documents(docs, embedder, ids=ids)
         return cls(store, embedder)
 
     @classmethod
-    def load(cls, faiss_dir: str, embedding_model: Optional[str] = None):
-        embed_kwargs = {}
-        if embedding_model:
-            embed_kwargs["model"] = embedding_model
-        embedder = OpenAIEmbeddings(**embed_kwargs)
+    def from_embeddings(cls, docs: List[Document], vectors: List[List[float]], embedding_model: Optional[str] = None,
+                        embedder=None, ids: Optional[List[str]] = None):
+        # Precomputed vectors (e.g. shared with the Mongo writer); embedder is only used for queries
+        embedder = embedder or make_embedder(embedding_model)
+        store = FAISS.from_embeddings(
+            list(zip([d.page_content for d in docs], vectors)), embedder,
+            metadatas=[d.metadata for d in docs], ids=ids
+        )
+        return cls(store, embedder)
+
+    @classmethod
+    def load(cls, faiss_dir: str, embedding_model: Optional[str] = None, embedder=None):
+        embedder = embedder or make_embedder(embedding_model)
         store = FAISS.load_local(faiss_dir, embedder)
         return cls(store, embedder)
 
+    @staticmethod
+    def exists(faiss_dir: str) -> bool:
+        return os.path.isfile(os.path.join(faiss_dir, "index.faiss"))
+
     def save(self, faiss_dir: str):
         self.store.save_local(faiss_dir)
 
-    def add_documents(self, docs: List[Document]):
-        self.store.add_documents(docs)
+    def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None):
+        self.store.add_documents(docs, ids=ids)
+
+    def add_embeddings(self, docs: List[Document], vectors: List[List[float]], ids: Optional[List[str]] = None):
+        self.store.add_embeddings(
+            list(zip([d.page_content for d in docs], vectors)),
+            metadatas=[d.metadata for d in docs], ids=ids
+        )
 
     def rebuild(self, docs: List[Document]):
         self.store = FAISS.from_documents(docs, self.embedder)
@@ -41,5 +63,47 @@ class FaissIndex:
             return self.store.delete(ids)
         raise NotImplementedError("Delete is not supported by this FAISS wrapper/version.")
 
+    def ids(self):
+        return set(self.store.index_to_docstore_id.values())
+
+    def update_metadata(self, updates):
+        """Merge fields into stored docs' metadata: {doc_id: {field: value}}."""
+        for doc_id, fields in updates.items():
+            doc = self.store.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                doc.metadata.update(fields)
+
     def similarity_search(self, query: str, k: int = 8):
         return self.store.similarity_search(query, k=k)
+
+    def iter_documents(self):
+        for doc_id in self.store.index_to_docstore_id.values():
+            yield self.store.docstore.search(doc_id)
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        # One embedding call for the whole batch
+        return self.embedder.embed_documents(queries)
+
+    def search_vectors(self, vectors, k: int = 8):
+        """Run one matrix search for many query vectors -> [[(Document, score)]]."""
+        import numpy as np
+        import faiss
+
+        matrix = np.asarray(vectors, dtype="float32")
+        if getattr(self.store, "_normalize_L2", False):
+            faiss.normalize_L2(matrix)
+        scores, indices = self.store.index.search(matrix, k)
+        results = []
+        for row_scores, row_indices in zip(scores, indices):
+            hits = []
+            for score, i in zip(row_scores, row_indices):
+                if i == -1:
+                    continue
+                doc_id = self.store.index_to_docstore_id[int(i)]
+                hits.append((self.store.docstore.search(doc_id), float(score)))
+            results.append(hits)
+        return results
+
+    def similarity_search_batch(self, queries: List[str], k: int = 8):
+        hits = self.search_vectors(self.embed_queries(queries), k=k)
+        return [[doc for doc, _ in row] for row in hits]
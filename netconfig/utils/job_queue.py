@@ -0,0 +1,331 @@
+"""SQLite work queue for --job mode.
+
+One `tasks` row per unit of work (a device, or the final FAISS build) and one
+`checkpoints` row per finished (task, stage). Workers on any host that can
+open the database claim tasks under `BEGIN IMMEDIATE`, so two workers never
+get the same task. A claim is a lease: a worker that dies without releasing
+its task loses it when the lease expires; a live worker renews the lease
+from a background thread (`keep_alive`), and writes from a worker that
+lost its lease are dropped (`checkpoint` raises `LeaseLost`). Failures are retried with
+exponential backoff up to `max_attempts`, then the task is marked failed.
+
+The database uses SQLite's rollback journal (not WAL), which only needs
+POSIX file locks; on a network filesystem those locks must work (NFSv4,
+or NFSv3 with lockd).
+"""
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Source config deleted; kept out of claims and of the FAISS build
+REMOVED = "removed"
+
+DEFAULT_LEASE = 600.0
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF = 30.0
+MAX_BACKOFF = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT,
+    signature TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_claim ON tasks (kind, status, next_attempt);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    name TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    done_at REAL NOT NULL,
+    worker TEXT,
+    PRIMARY KEY (name, stage)
+);
+"""
+
+class LeaseLost(Exception):
+    """The task was reclaimed by another worker after this one's lease expired."""
+
+class Task:
+    __slots__ = ("name", "kind", "source", "attempts")
+
+    def __init__(self, name: str, kind: str, source: Optional[str], attempts: int):
+        self.name = name
+        self.kind = kind
+        self.source = source
+        self.attempts = attempts
+
+class JobQueue:
+    def __init__(self, path: str, lease: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 backoff: float = DEFAULT_BACKOFF):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        # Autocommit; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, timeout=60.0, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def add(self, name: str, kind: str, source: Optional[str] = None, signature: Optional[str] = None) -> str:
+        """Queue a task. Returns "new", "changed" (signature differs, or it
+        was removed and is back: its checkpoints are dropped and it runs
+        again) or "same". Names are shared by all kinds: a name already
+        queued under another kind raises ValueError."""
+        now = time.time()
+        with self.transaction():
+            row = self.conn.execute("SELECT signature, status, kind FROM tasks WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO tasks (name, kind, source, signature, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, kind, source, signature, PENDING, now)
+                )
+                return "new"
+            if row[2] != kind:
+                raise ValueError(f"task {name!r} is already queued as a {row[2]} task, not {kind}")
+            if row[0] == signature and row[1] != REMOVED:
+                return "same"
+            self.conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+            self.conn.execute(
+                "UPDATE tasks SET source = ?, signature = ?, status = ?, attempts = 0, next_attempt = 0, "
+                "error = NULL, updated_at = ? WHERE name = ?",
+                (source, signature, PENDING, now, name)
+            )
+            return "changed"
+
+    def remove(self, name: str, kind: str) -> bool:
+        """Delete a task of `kind` and its checkpoints (e.g. one renamed)."""
+        with self.transaction():
+            cur = self.conn.execute("DELETE FROM tasks WHERE name = ? AND kind = ?", (name, kind))
+            if cur.rowcount:
+                self.conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+            return cur.rowcount > 0
+
+    def reopen(self, name: str) -> bool:
+        """Run a finished task again (e.g. the FAISS build after devices changed)."""
+        with self.transaction():
+            cur = self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, error = NULL, updated_at = ? "
+                "WHERE name = ? AND status != ?",
+                (PENDING, time.time(), name, RUNNING)
+            )
+            return cur.rowcount > 0
+
+    def require_stages(self, kind: str, stages: List[str]) -> int:
+        """Requeue done tasks missing a checkpoint for any of `stages`
+        (a rerun that adds e.g. --mongo-dump). Returns how many."""
+        requeued = 0
+        with self.transaction():
+            for stage in stages:
+                cur = self.conn.execute(
+                    "UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, updated_at = ? "
+                    "WHERE kind = ? AND status = ? AND name NOT IN "
+                    "(SELECT name FROM checkpoints WHERE stage = ?)",
+                    (PENDING, time.time(), kind, DONE, stage)
+                )
+                requeued += cur.rowcount
+        return requeued
+
+    def remove_missing(self, kind: str) -> List[str]:
+        """Mark tasks whose source file no longer exists as removed (dropping
+        their checkpoints). Returns their names."""
+        rows = self.conn.execute(
+            "SELECT name, source FROM tasks WHERE kind = ? AND status != ? AND source IS NOT NULL",
+            (kind, REMOVED)
+        ).fetchall()
+        missing = [name for name, source in rows if not os.path.isfile(source)]
+        if missing:
+            with self.transaction():
+                for name in missing:
+                    self.conn.execute("DELETE FROM checkpoints WHERE name = ?", (name,))
+                    self.conn.execute(
+                        "UPDATE tasks SET status = ?, lease_until = NULL, updated_at = ? WHERE name = ?",
+                        (REMOVED, time.time(), name)
+                    )
+        return missing
+
+    def retry_failed(self) -> int:
+        with self.transaction():
+            cur = self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = 0, next_attempt = 0, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), FAILED)
+            )
+            return cur.rowcount
+
+    def claim(self, worker: str, kind: str) -> Optional[Task]:
+        """Lease the next runnable task of `kind`: pending and past its backoff,
+        or running with an expired lease (its worker died)."""
+        now = time.time()
+        with self.transaction():
+            # Expired leases past the attempt limit are given up on instead of reclaimed
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, error = COALESCE(error, 'lease expired'), updated_at = ? "
+                "WHERE kind = ? AND status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, kind, RUNNING, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                "SELECT name, kind, source, attempts FROM tasks WHERE kind = ? AND "
+                "((status = ? AND next_attempt <= ?) OR (status = ? AND lease_until < ?)) "
+                "ORDER BY next_attempt, name LIMIT 1",
+                (kind, PENDING, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE name = ?",
+                (RUNNING, worker, now + self.lease, now, row[0])
+            )
+        return Task(row[0], row[1], row[2], row[3] + 1)
+
+    def _renew(self, conn, task: Task, worker: str) -> bool:
+        cur = conn.execute(
+            "UPDATE tasks SET lease_until = ? WHERE name = ? AND worker = ? AND status = ?",
+            (time.time() + self.lease, task.name, worker, RUNNING)
+        )
+        return cur.rowcount > 0
+
+    def heartbeat(self, task: Task, worker: str) -> bool:
+        """Extend the lease; False if the task is no longer ours."""
+        with self.transaction():
+            return self._renew(self.conn, task, worker)
+
+    @contextmanager
+    def keep_alive(self, task: Task, worker: str, interval: Optional[float] = None):
+        """Renew the lease every `interval` seconds (default a third of the
+        lease) while the body runs, e.g. during a long embedding call. The
+        thread uses its own connection (sqlite3 connections are per-thread)."""
+        interval = interval or max(self.lease / 3.0, 0.1)
+        stop = threading.Event()
+
+        def beat():
+            conn = sqlite3.connect(self.path, timeout=60.0, isolation_level=None)
+            try:
+                while not stop.wait(interval):
+                    try:
+                        if not self._renew(conn, task, worker):
+                            return
+                    except sqlite3.Error:
+                        continue
+            finally:
+                conn.close()
+
+        thread = threading.Thread(target=beat, name=f"lease-{task.name}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def checkpoint(self, task: Task, stage: str, worker: str):
+        """Record a finished stage and renew the lease. Raises LeaseLost
+        (nothing recorded) if another worker owns the task now."""
+        with self.transaction():
+            if not self._renew(self.conn, task, worker):
+                raise LeaseLost(task.name)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (name, stage, done_at, worker) VALUES (?, ?, ?, ?)",
+                (task.name, stage, time.time(), worker)
+            )
+
+    def done_stages(self, name: str) -> Set[str]:
+        return {row[0] for row in self.conn.execute("SELECT stage FROM checkpoints WHERE name = ?", (name,))}
+
+    def complete(self, task: Task, worker: str) -> bool:
+        """Mark done; False (result dropped) if the task is no longer ours."""
+        with self.transaction():
+            cur = self.conn.execute(
+                "UPDATE tasks SET status = ?, error = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE name = ? AND worker = ? AND status = ?",
+                (DONE, time.time(), task.name, worker, RUNNING)
+            )
+            return cur.rowcount > 0
+
+    def fail(self, task: Task, worker: str, error: str) -> Optional[str]:
+        """Record a failure: back to pending after a backoff delay, or failed
+        once `max_attempts` is used up. Returns the new status, or None if the
+        task is no longer ours (nothing recorded)."""
+        now = time.time()
+        if task.attempts >= self.max_attempts:
+            status, next_attempt = FAILED, now
+        else:
+            status = PENDING
+            next_attempt = now + min(self.backoff * 2 ** (task.attempts - 1), MAX_BACKOFF)
+        with self.transaction():
+            cur = self.conn.execute(
+                "UPDATE tasks SET status = ?, next_attempt = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE name = ? AND worker = ? AND status = ?",
+                (status, next_attempt, error[:2000], now, task.name, worker, RUNNING)
+            )
+        return status if cur.rowcount else None
+
+    def release(self, task: Task, worker: str):
+        """Give a task back without counting the attempt (worker interrupted)."""
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = MAX(attempts - 1, 0), lease_until = NULL, updated_at = ? "
+                "WHERE name = ? AND worker = ? AND status = ?",
+                (PENDING, time.time(), task.name, worker, RUNNING)
+            )
+
+    def counts(self, kind: Optional[str] = None) -> Dict[str, int]:
+        query = "SELECT status, COUNT(*) FROM tasks"
+        params = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0, REMOVED: 0}
+        counts.update(dict(self.conn.execute(query + " GROUP BY status", params).fetchall()))
+        return counts
+
+    def next_wakeup(self, kind: str) -> Optional[float]:
+        """Earliest time a pending or leased task of `kind` may become claimable."""
+        row = self.conn.execute(
+            "SELECT MIN(CASE WHEN status = ? THEN next_attempt ELSE lease_until END) FROM tasks "
+            "WHERE kind = ? AND status IN (?, ?)",
+            (PENDING, kind, PENDING, RUNNING)
+        ).fetchone()
+        return row[0]
+
+    def names(self, kind: str, status: Optional[str] = None) -> List[str]:
+        query = "SELECT name FROM tasks WHERE kind = ?"
+        params = [kind]
+        if status:
+            query += " AND status = ?"
+            params.append(status)
+        return [row[0] for row in self.conn.execute(query + " ORDER BY name", params)]
+
+    def failures(self, kind: Optional[str] = None) -> List[tuple]:
+        query = "SELECT name, attempts, error FROM tasks WHERE status = ?"
+        params = [FAILED]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return self.conn.execute(query + " ORDER BY name", params).fetchall()
+
+    def close(self):
+        self.conn.close()
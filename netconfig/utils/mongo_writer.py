@@ -1,6 +1,6 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 
 DEFAULT_DB = "net_config"
 
@@ -22,6 +22,12 @@ class MongoStore:
             return None
         return self.db[name]
 
+    def find(self, collection_name: str, filt: Dict[str, Any], projection: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        if self.dry_run:
+            print(f"[DRY-RUN] find in {collection_name}")
+            return []
+        return list(self.collection(collection_name).find(filt, projection))
+
     def insert_one(self, collection_name: str, doc: Dict[str, Any]):
         if self.dry_run:
             print(f"[DRY-RUN] insert_one into {collection_name}")
@@ -41,6 +47,14 @@ class MongoStore:
             return
         self.collection(collection_name).update_one(filt, update, upsert=upsert)
 
+    def bulk_update(self, collection_name: str, updates: List[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        if self.dry_run:
+            print(f"[DRY-RUN] bulk_update {collection_name} count={len(updates)}")
+            return
+        if updates:
+            ops = [UpdateOne(filt, update) for filt, update in updates]
+            self.collection(collection_name).bulk_write(ops, ordered=False)
+
     def delete_one(self, collection_name: str, filt: Dict[str, Any]):
         if self.dry_run:
             print(f"[DRY-RUN] delete_one from {collection_name} filter={filt}")
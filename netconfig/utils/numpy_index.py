@@ -0,0 +1,263 @@
+"""Exact-search vector index on NumPy, with the same interface as FaissIndex.
+
+Embeddings live in one contiguous float32 matrix (`vectors.npy`, opened with
+mmap on load) and metadata in a columnar table (`metadata.json`: ids,
+contents and one list per metadata field). Search is brute force: squared
+L2 distances from matrix products (the same scores as the FAISS flat L2
+index), `argpartition` for the top k, many queries per call. A `filter`
+such as {"device": "R1", "section_type": ["router", "interface"]} is turned
+into a row mask from cached per-column codes before anything is scored.
+No langchain or faiss import is needed unless an embedder must be created.
+"""
+import os
+import json
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .embeddings import Document, make_embedder
+
+VECTORS_FILE = "vectors.npy"
+METADATA_FILE = "metadata.json"
+# Max query x row distance entries scored at once (~64 MB of float32)
+SCORE_BLOCK = 1 << 24
+
+class NumpyIndex:
+    # search_vectors/similarity_search take filter={column: value or [values]}
+    supports_filter = True
+
+    def __init__(self, vectors: np.ndarray, ids: List[str], contents: List[str],
+                 columns: Dict[str, List[Any]], embedder=None):
+        self._vectors = vectors
+        # Blocks appended by add_embeddings, concatenated once on first use
+        self._pending: List[np.ndarray] = []
+        self._ids = list(ids)
+        self.contents = list(contents)
+        self.columns = columns
+        self.embedder = embedder
+        self._reset_cache()
+
+    def _reset_cache(self):
+        self._pos = {doc_id: i for i, doc_id in enumerate(self._ids)}
+        self._sq_norms = None
+        # column -> (value -> code, codes array)
+        self._codes: Dict[str, Any] = {}
+
+    @property
+    def vectors(self) -> np.ndarray:
+        if self._pending:
+            blocks = [self._vectors] + self._pending if len(self._vectors) else self._pending
+            self._vectors = np.concatenate(blocks)
+            self._pending = []
+        return self._vectors
+
+    @vectors.setter
+    def vectors(self, matrix: np.ndarray):
+        self._vectors = matrix
+        self._pending = []
+
+    @staticmethod
+    def _columns_from(metadatas: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        names = []
+        for meta in metadatas:
+            for name in meta:
+                if name not in names:
+                    names.append(name)
+        return {name: [meta.get(name) for meta in metadatas] for name in names}
+
+    @classmethod
+    def from_documents(cls, docs: List[Document], embedding_model: Optional[str] = None, embedder=None,
+                       ids: Optional[List[str]] = None):
+        embedder = embedder or make_embedder(embedding_model)
+        vectors = embedder.embed_documents([d.page_content for d in docs]) if docs else []
+        return cls.from_embeddings(docs, vectors, embedder=embedder, ids=ids)
+
+    @classmethod
+    def from_embeddings(cls, docs: List[Document], vectors: List[List[float]], embedding_model: Optional[str] = None,
+                        embedder=None, ids: Optional[List[str]] = None):
+        # embedder is only used for queries and add_documents
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if not docs:
+            # No rows yet; the width is set by the first add_embeddings
+            matrix = np.zeros((0, matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32)
+        elif matrix.ndim != 2:
+            matrix = matrix.reshape(len(docs), -1)
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in docs]
+        return cls(matrix, ids, [d.page_content for d in docs],
+                   cls._columns_from([d.metadata for d in docs]), embedder or cls._lazy_embedder(embedding_model))
+
+    @classmethod
+    def load(cls, index_dir: str, embedding_model: Optional[str] = None, embedder=None, mmap: bool = True):
+        vectors = np.load(os.path.join(index_dir, VECTORS_FILE), mmap_mode="r" if mmap else None)
+        with open(os.path.join(index_dir, METADATA_FILE)) as f:
+            meta = json.load(f)
+        return cls(vectors, meta["ids"], meta["contents"], meta["columns"], embedder or cls._lazy_embedder(embedding_model))
+
+    @staticmethod
+    def exists(index_dir: str) -> bool:
+        return os.path.isfile(os.path.join(index_dir, VECTORS_FILE))
+
+    def save(self, index_dir: str):
+        # Write-then-rename: the current matrix may be a mmap of the old file
+        os.makedirs(index_dir, exist_ok=True)
+        vec_path = os.path.join(index_dir, VECTORS_FILE)
+        with open(vec_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.vectors, dtype=np.float32))
+        meta_path = os.path.join(index_dir, METADATA_FILE)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"dim": self.dim, "ids": self._ids, "contents": self.contents, "columns": self.columns}, f)
+        os.replace(vec_path + ".tmp", vec_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @staticmethod
+    def _lazy_embedder(embedding_model: Optional[str] = None):
+        return _LazyEmbedder(make_embedder, embedding_model)
+
+    @property
+    def dim(self) -> int:
+        if self._pending:
+            return int(self._pending[0].shape[1])
+        return int(self._vectors.shape[1]) if self._vectors.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add_documents(self, docs: List[Document], ids: Optional[List[str]] = None):
+        if docs:
+            self.add_embeddings(docs, self.embedder.embed_documents([d.page_content for d in docs]), ids=ids)
+
+    def add_embeddings(self, docs: List[Document], vectors: List[List[float]], ids: Optional[List[str]] = None):
+        if not docs:
+            return
+        ids = list(ids) if ids is not None else [uuid.uuid4().hex for _ in docs]
+        # Appends are O(len(docs)): the matrix is concatenated once, before the next search or save
+        self._pending.append(np.asarray(vectors, dtype=np.float32).reshape(len(docs), -1))
+        count = len(self._ids)
+        for name, values in self._columns_from([d.metadata for d in docs]).items():
+            self.columns.setdefault(name, [None] * count).extend(values)
+        for name, values in self.columns.items():
+            if len(values) < count + len(docs):
+                values.extend([None] * (count + len(docs) - len(values)))
+        for row, doc_id in enumerate(ids, start=count):
+            self._pos[doc_id] = row
+        self._ids.extend(ids)
+        self.contents.extend(d.page_content for d in docs)
+        self._sq_norms = None
+        self._codes = {}
+
+    def rebuild(self, docs: List[Document]):
+        rebuilt = self.from_documents(docs, embedder=self.embedder)
+        self.__dict__.update(rebuilt.__dict__)
+
+    def delete_ids(self, ids: List[str]):
+        drop = {self._pos[doc_id] for doc_id in ids if doc_id in self._pos}
+        if not drop:
+            return False
+        keep = np.array([i for i in range(len(self._ids)) if i not in drop], dtype=np.int64)
+        self.vectors = np.asarray(self.vectors)[keep]
+        self._ids = [self._ids[i] for i in keep]
+        self.contents = [self.contents[i] for i in keep]
+        self.columns = {name: [values[i] for i in keep] for name, values in self.columns.items()}
+        self._reset_cache()
+        return True
+
+    def ids(self):
+        return set(self._ids)
+
+    def update_metadata(self, updates):
+        """Merge fields into stored docs' metadata: {doc_id: {field: value}}."""
+        for doc_id, fields in updates.items():
+            row = self._pos.get(doc_id)
+            if row is None:
+                continue
+            for name, value in fields.items():
+                self.columns.setdefault(name, [None] * len(self._ids))[row] = value
+                self._codes.pop(name, None)
+
+    def document(self, row: int) -> Document:
+        meta = {name: values[row] for name, values in self.columns.items() if values[row] is not None}
+        return Document(page_content=self.contents[row], metadata=meta)
+
+    def iter_documents(self):
+        for row in range(len(self._ids)):
+            yield self.document(row)
+
+    def column_mask(self, name: str, values) -> np.ndarray:
+        if name not in self._codes:
+            lookup: Dict[Any, int] = {}
+            codes = np.fromiter(
+                (lookup.setdefault(v, len(lookup)) for v in self.columns.get(name, [None] * len(self._ids))),
+                dtype=np.int32, count=len(self._ids)
+            )
+            self._codes[name] = (lookup, codes)
+        lookup, codes = self._codes[name]
+        if isinstance(values, (str, int, float)) or values is None:
+            values = [values]
+        wanted = [lookup[v] for v in values if v in lookup]
+        return np.isin(codes, wanted)
+
+    def mask(self, filter: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """Row mask for {column: value or [values]} (all must match), or None."""
+        if not filter:
+            return None
+        result = np.ones(len(self._ids), dtype=bool)
+        for name, values in filter.items():
+            result &= self.column_mask(name, values)
+        return result
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        # One embedding call for the whole batch
+        return self.embedder.embed_documents(queries)
+
+    def search_vectors(self, vectors, k: int = 8, filter: Optional[Dict[str, Any]] = None):
+        """Exact top-k for many query vectors -> [[(Document, squared L2 distance)]]."""
+        queries = np.asarray(vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        rows = np.arange(len(self._ids)) if filter is None else np.flatnonzero(self.mask(filter))
+        k = min(k, len(rows))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+        if self._sq_norms is None:
+            self._sq_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+        matrix = self.vectors if filter is None else self.vectors[rows]
+        sq_norms = self._sq_norms if filter is None else self._sq_norms[rows]
+
+        results = []
+        step = max(1, SCORE_BLOCK // max(len(rows), 1))
+        for start in range(0, len(queries), step):
+            block = queries[start:start + step]
+            scores = sq_norms[None, :] - 2.0 * (block @ matrix.T)
+            scores += np.einsum("ij,ij->i", block, block)[:, None]
+            np.maximum(scores, 0.0, out=scores)
+            top = np.argpartition(scores, k - 1, axis=1)[:, :k] if k < len(rows) else \
+                np.broadcast_to(np.arange(len(rows)), (len(block), len(rows)))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row_idx, row_scores in zip(top, top_scores):
+                results.append([(self.document(int(rows[i])), float(s)) for i, s in zip(row_idx, row_scores)])
+        return results
+
+    def similarity_search(self, query: str, k: int = 8, filter: Optional[Dict[str, Any]] = None):
+        return [doc for doc, _ in self.search_vectors([self.embedder.embed_query(query)], k=k, filter=filter)[0]]
+
+    def similarity_search_batch(self, queries: List[str], k: int = 8, filter: Optional[Dict[str, Any]] = None):
+        hits = self.search_vectors(self.embed_queries(queries), k=k, filter=filter)
+        return [[doc for doc, _ in row] for row in hits]
+
+class _LazyEmbedder:
+    """Creates the real embedder on first use, so loading and searching by
+    vector work without langchain/openai installed."""
+
+    def __init__(self, factory, embedding_model: Optional[str] = None):
+        self.factory = factory
+        self.embedding_model = embedding_model
+        self.embedder = None
+
+    def __getattr__(self, name):
+        if self.embedder is None:
+            self.embedder = self.factory(self.embedding_model)
+        return getattr(self.embedder, name)
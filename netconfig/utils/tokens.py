@@ -0,0 +1,29 @@
+"""Token counting helpers (tiktoken), shared by chunk sizing and context packing."""
+from functools import lru_cache
+from typing import Optional
+
+DEFAULT_ENCODING = "cl100k_base"
+
+@lru_cache(maxsize=None)
+def get_encoding(model: Optional[str] = None):
+    # Loading an encoding is expensive; one instance per model is reused everywhere
+    try:
+        import tiktoken
+    except Exception:
+        raise RuntimeError("tiktoken is required for token counting. Install tiktoken.")
+    if model:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return len(get_encoding(model).encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    enc = get_encoding(model)
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
@@ -0,0 +1,16 @@
+"""Vector index backends, selected with --vector-backend.
+
+Both classes share one interface (from_documents, from_embeddings, load,
+save, exists, add_documents, add_embeddings, delete_ids, update_metadata,
+similarity_search, similarity_search_batch, search_vectors, ...).
+"""
+VECTOR_BACKENDS = ("faiss", "numpy")
+
+def get_index_class(backend: str = "faiss"):
+    if backend == "faiss":
+        from .faiss_index import FaissIndex
+        return FaissIndex
+    if backend == "numpy":
+        from .numpy_index import NumpyIndex
+        return NumpyIndex
+    raise ValueError(f"Unknown vector backend '{backend}'. Supported: {', '.join(VECTOR_BACKENDS)}")
@@ -0,0 +1,134 @@
+"""Directory watching for --watch mode.
+
+`InotifyWatcher` uses Linux inotify through ctypes (no extra dependency);
+`PollingWatcher` diffs an os.scandir snapshot of (mtime, size) per file.
+Both return the names of files that changed since the last call, or None
+when events were lost and the caller should rescan. `Debouncer` holds
+names until writes to them have been quiet for `delay` seconds.
+"""
+import os
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+from typing import Dict, List, Optional, Set, Tuple
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+DEFAULT_POLL_INTERVAL = 2.0
+
+class InotifyWatcher:
+    def __init__(self, path: str, suffix: str = ".cfg"):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.suffix = suffix
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    def poll(self, timeout: float) -> Optional[Set[str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except OSError as exc:
+            if exc.errno == errno.EAGAIN:
+                return set()
+            raise
+        names = set()
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name.endswith(self.suffix):
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    def __init__(self, path: str, suffix: str = ".cfg", interval: float = DEFAULT_POLL_INTERVAL):
+        self.path = path
+        self.suffix = suffix
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.endswith(self.suffix) and entry.is_file():
+                    st = entry.stat()
+                    state[entry.name] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def poll(self, timeout: float) -> Optional[Set[str]]:
+        time.sleep(min(timeout, self.interval))
+        current = self.scan()
+        changed = {name for name, sig in current.items() if self.snapshot.get(name) != sig}
+        changed.update(name for name in self.snapshot if name not in current)
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+def make_watcher(path: str, suffix: str = ".cfg", poll_interval: float = DEFAULT_POLL_INTERVAL, polling: bool = False):
+    """inotify when the platform supports it, else polling."""
+    if not polling:
+        try:
+            return InotifyWatcher(path, suffix)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(path, suffix, poll_interval)
+
+class Debouncer:
+    def __init__(self, delay: float):
+        self.delay = delay
+        # name -> (first event, last event)
+        self.pending: Dict[str, Tuple[float, float]] = {}
+
+    def touch(self, name: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        first, _ = self.pending.get(name, (now, now))
+        self.pending[name] = (first, now)
+
+    def ready(self, now: Optional[float] = None, limit: Optional[int] = None,
+              skip: Optional[Set[str]] = None) -> List[Tuple[str, float]]:
+        """Pop names quiet for `delay` seconds (oldest first): [(name, first_event)].
+        Names in `skip` (e.g. still being processed) stay pending."""
+        now = time.monotonic() if now is None else now
+        quiet = sorted(
+            (first, name) for name, (first, last) in self.pending.items()
+            if now - last >= self.delay and not (skip and name in skip)
+        )
+        if limit is not None:
+            quiet = quiet[:max(limit, 0)]
+        for _, name in quiet:
+            del self.pending[name]
+        return [(name, first) for first, name in quiet]
+
+    def __len__(self) -> int:
+        return len(self.pending)
@@ -0,0 +1,122 @@
+"""Measure memory and allocations per chunk: ChunkRecord vs the old dict chunks.
+
+Chunks every config in --config-dir once to get the chunk layout, then builds
+it --copies times (simulating a fleet) in each representation and holds the
+result. The dict baseline is the pre-ChunkRecord builder's construction
+(`{"content", "metadata": {device, chunk_type, section}}`, then os_type,
+chunk_index, section_type and chunk_id added by build_chunks), carrying the
+fields added since (hash, spans, hierarchy) so both hold the same data.
+Content is joined from lines per chunk in both, as the builder does.
+
+Reported from tracemalloc: bytes held, peak bytes during the build and
+allocated blocks held, per chunk.
+"""
+import os
+import sys
+import gc
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from netconfig.core.config_prep import prepare_configs
+from netconfig.core.chunk_builder import build_chunks, derive_section_type, stable_chunk_id
+from netconfig.core.chunk_record import ChunkRecord
+
+SPAN_FIELDS = ("content_hash", "line_start", "line_end", "byte_start", "byte_end", "section_path", "depth")
+
+def chunk_layout(device, os_type, text):
+    """Per chunk: content lines, chunk_type, section, span fields, id occurrence, parent position."""
+    records = build_chunks(device, os_type, text)
+    position = {id(r): i for i, r in enumerate(records)}
+    by_id = {r.chunk_id: r for r in records}
+    layout = []
+    for r in records:
+        parent = by_id.get(r.parent_id)
+        layout.append((
+            r.content.split("\n"), r.chunk_type, r.section,
+            tuple(getattr(r, name) for name in SPAN_FIELDS),
+            int(r.chunk_id.rsplit("|", 2)[1]),
+            position[id(parent)] if parent is not None else None,
+        ))
+    return layout
+
+def build_dicts(device, os_type, layout):
+    chunks = []
+    for idx, (lines, chunk_type, section, span, occurrence, parent) in enumerate(layout):
+        metadata = {"device": device, "chunk_type": chunk_type}
+        if chunk_type == "explicit":
+            metadata["section"] = section
+        c = {"content": "\n".join(lines), "metadata": metadata}
+        c["metadata"]["os_type"] = os_type
+        c["metadata"]["chunk_index"] = idx
+        c["metadata"]["section_type"] = derive_section_type(
+            c["metadata"].get("section"),
+            c["metadata"].get("chunk_type")
+        )
+        for name, value in zip(SPAN_FIELDS, span):
+            if value is not None:
+                c["metadata"][name] = value
+        c["metadata"]["chunk_id"] = stable_chunk_id(device, section, occurrence, span[0])
+        if parent is not None:
+            c["metadata"]["parent_id"] = chunks[parent]["metadata"]["chunk_id"]
+        chunks.append(c)
+    return chunks
+
+def build_records(device, os_type, layout):
+    os_type = sys.intern(os_type)
+    chunks = []
+    for idx, (lines, chunk_type, section, span, occurrence, parent) in enumerate(layout):
+        c = ChunkRecord("\n".join(lines), device, chunk_type, section=section, os_type=os_type, chunk_index=idx)
+        c.section_type = sys.intern(derive_section_type(section, chunk_type))
+        (c.content_hash, c.line_start, c.line_end, c.byte_start, c.byte_end, path, c.depth) = span
+        c.section_path = sys.intern(path) if path else None
+        c.chunk_id = stable_chunk_id(c.device, section, occurrence, c.content_hash)
+        if parent is not None:
+            c.parent_id = chunks[parent].chunk_id
+        chunks.append(c)
+    return chunks
+
+def measure(label, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    held = build()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    count = len(held)
+    print(
+        f"{label:>8}: chunks={count} bytes/chunk={current / count:.0f} peak/chunk={peak / count:.0f} "
+        f"allocs/chunk={blocks / count:.1f} build_s={elapsed:.3f}"
+    )
+    return held
+
+def main():
+    argp = argparse.ArgumentParser(description="Chunk memory benchmark (records vs dicts).")
+    argp.add_argument("--config-dir", default="configs", help="Directory of .cfg files")
+    argp.add_argument("--copies", type=int, default=200, help="Times to rebuild each config")
+    args = argp.parse_args()
+
+    prepared = prepare_configs(config_dir=args.config_dir, detect_os=True)
+    layouts = [(item["device"], item["os_type"], chunk_layout(item["device"], item["os_type"], item["text"]))
+               for item in prepared]
+
+    def build(make):
+        def run():
+            held = []
+            for n in range(args.copies):
+                for device, os_type, layout in layouts:
+                    held.extend(make(f"{device}-{n}", os_type, layout))
+            return held
+        return run
+
+    records = measure("records", build(build_records))
+    del records
+    dicts = measure("dicts", build(build_dicts))
+    del dicts
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
+import os
+import sys
 import argparse
 import json
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import TypedDict, List, Dict, Any
 from langchain.schema import Document
 from langchain.embeddings import OpenAIEmbeddings
@@ -8,8 +12,21 @@ from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from netconfig.utils.vector_index import VECTOR_BACKENDS
+
 DEFAULT_INDEX_DIR = "index/faiss"
 DEFAULT_K = 8
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_CONCURRENCY = 8
+DEFAULT_CONTEXT_TOKENS = 6000
+
+PROMPT = ChatPromptTemplate.from_template(
+    """Use ONLY the configs below. Return STRICT JSON.
+{ "found": true|false, "results": [] }
+Question: {question}
+Configs: {configs}
+""")
 
 class GraphState(TypedDict):
     question: str
@@ -19,46 +36,216 @@ class GraphState(TypedDict):
 def load_store(index_dir: str):
     return FAISS.load_local(index_dir, OpenAIEmbeddings())
 
-def retrieve_node_factory(index_dir: str, k: int):
+def load_index(index_dir: str, backend: str = "faiss", embedding_model: str = None):
+    from netconfig.utils.vector_index import get_index_class
+    return get_index_class(backend).load(index_dir, embedding_model)
+
+def retrieve_node_factory(index_dir: str, k: int, device: str = None, expand=None, backend: str = "faiss"):
+    from netconfig.core.dedup import load_refs, search_resolved
+    refs = load_refs(index_dir)
+
     def retrieve_node(state: GraphState):
-        store = load_store(index_dir)
-        state["retrieved_docs"] = store.similarity_search(state["question"], k=k)
+        if refs is not None or backend != "faiss":
+            # numpy backend: the device filter is a row mask applied before scoring
+            docs = search_resolved(load_index(index_dir, backend), refs, state["question"], k=k, device=device)
+        else:
+            store = load_store(index_dir)
+            if device:
+                docs = store.similarity_search(state["question"], k=k, filter={"device": device})
+            else:
+                docs = store.similarity_search(state["question"], k=k)
+        state["retrieved_docs"] = expand(docs) if expand else docs
         return state
 
     return retrieve_node
 
-def reason_node(state: GraphState):
-    llm = ChatOpenAI(temperature=0)
-    prompt = ChatPromptTemplate.from_template(
-        """Use ONLY the configs below. Return STRICT JSON.
-{ "found": true|false, "results": [] }
-Question: {question}
-Configs: {configs}
-""")
-    configs_text = "\n".join(d.page_content for d in state["retrieved_docs"])
-    resp = llm.invoke(prompt.format_messages(question=state["question"], configs=configs_text))
+def make_ref_expander(chunks_dir: str, max_depth: int = None):
+    """Append the objects retrieved chunks depend on (route-maps, prefix-lists,
+    ACLs, VRFs, ... via the xref index next to the chunk files) after the hits."""
+    from netconfig.core.xref import load_xref
+    cache = {}
+
+    def device_state(device):
+        if device not in cache:
+            xref = load_xref(chunks_dir, device) if device else None
+            path = os.path.join(chunks_dir, f"{device}.json")
+            chunks = {}
+            if xref is not None and os.path.isfile(path):
+                with open(path) as f:
+                    chunks = {c["metadata"]["chunk_id"]: c for c in json.load(f)}
+            cache[device] = (xref, chunks)
+        return cache[device]
+
+    def expand(docs: List[Document]) -> List[Document]:
+        out = list(docs)
+        seen = {d.metadata.get("chunk_id") for d in docs}
+        for d in docs:
+            xref, chunks = device_state(d.metadata.get("device"))
+            if xref is None or d.metadata.get("chunk_id") not in chunks:
+                continue
+            for cid in xref.closure([d.metadata["chunk_id"]], max_depth)[1:]:
+                if cid not in seen and cid in chunks:
+                    seen.add(cid)
+                    out.append(Document(page_content=chunks[cid]["content"], metadata=chunks[cid]["metadata"]))
+        return out
+
+    return expand
+
+def make_packer(index_dir: str, context_tokens: int, neighbors: int = 0, tokenizer_model: str = None,
+                backend: str = "faiss"):
+    """Token-budgeted context packer; None keeps the plain join."""
+    if not context_tokens:
+        return None
+    from netconfig.utils.context_pack import pack_context, build_neighbor_lookup
+    lookup = None
+    if neighbors:
+        lookup = build_neighbor_lookup(load_index(index_dir, backend).iter_documents()).get
+    return partial(pack_context, budget_tokens=context_tokens, neighbors=neighbors, lookup=lookup, model=tokenizer_model)
+
+def reason(llm, question: str, docs: List[Document], packer=None) -> Dict[str, Any]:
+    if packer:
+        configs_text = packer(docs)
+    else:
+        configs_text = "\n".join(d.page_content for d in docs)
+    resp = llm.invoke(PROMPT.format_messages(question=question, configs=configs_text))
     try:
         parsed = json.loads(resp.content)
     except:
         parsed = {"found": False, "results": []}
-    state["response"] = {"query": state["question"], **parsed}
-    return state
+    return {"query": question, **parsed}
+
+def reason_node_factory(packer=None):
+    def reason_node(state: GraphState):
+        llm = ChatOpenAI(temperature=0)
+        state["response"] = reason(llm, state["question"], state["retrieved_docs"], packer)
+        return state
 
-def build_graph(index_dir: str, k: int):
+    return reason_node
+
+reason_node = reason_node_factory()
+
+def build_graph(index_dir: str, k: int, packer=None, device: str = None, expand=None, backend: str = "faiss"):
     g = StateGraph(GraphState)
-    g.add_node("retrieve", retrieve_node_factory(index_dir, k))
-    g.add_node("reason", reason_node)
+    g.add_node("retrieve", retrieve_node_factory(index_dir, k, device, expand, backend))
+    g.add_node("reason", reason_node_factory(packer))
     g.set_entry_point("retrieve")
     g.add_edge("retrieve", "reason")
     return g.compile()
 
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    """JSONL of {"id": ..., "question": ..., "device": optional} objects or bare JSON strings."""
+    items = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry, str):
+                entry = {"question": entry}
+            entry.setdefault("id", lineno)
+            items.append(entry)
+    return items
+
+def compact_results(out_path: str) -> Dict[Any, Dict[str, Any]]:
+    """Rewrite `out_path` with one line per id, keeping the latest entry (a
+    retried error is replaced by its new result) at the id's first position.
+    A torn last line from an interrupted run is dropped. Returns {id: entry}."""
+    if not os.path.isfile(out_path):
+        return {}
+    latest = {}
+    with open(out_path, "rb") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            latest[entry.get("id")] = entry
+    tmp = out_path + ".tmp"
+    with open(tmp, "w") as f:
+        for entry in latest.values():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp, out_path)
+    return latest
+
+def load_done_ids(out_path: str) -> set:
+    """Ids already answered in `out_path` (compacted first); entries with an
+    error are retried."""
+    return {id_ for id_, entry in compact_results(out_path).items() if "error" not in entry}
+
+def run_batch(index_dir: str, k: int, questions_path: str, out_path: str,
+              batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = DEFAULT_CONCURRENCY,
+              embedding_model: str = None, packer=None, device: str = None, expand=None, backend: str = "faiss"):
+    from netconfig.core.dedup import load_refs, search_scoped
+
+    items = load_questions(questions_path)
+    done = load_done_ids(out_path)
+    pending = [item for item in items if item["id"] not in done]
+    print(f"[INFO] {len(items)} questions, {len(items) - len(pending)} already answered, {len(pending)} to run")
+    if not pending:
+        return
+
+    index = load_index(index_dir, backend, embedding_model)
+    refs = load_refs(index_dir)
+    llm = ChatOpenAI(temperature=0)
+    answered = 0
+    try:
+        with open(out_path, "a") as out, ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                # One embedding call + one matrix search for the whole batch (more only for
+                # device-scoped questions short of k hits)
+                vectors = index.embed_queries([item["question"] for item in batch])
+                hits = search_scoped(index, vectors, k, refs, [item.get("device") or device for item in batch])
+                scoped_docs = [[doc for doc, _ in row] for row in hits]
+                if expand:
+                    scoped_docs = [expand(docs) for docs in scoped_docs]
+                futures = {
+                    pool.submit(reason, llm, item["question"], docs, packer): item
+                    for item, docs in zip(batch, scoped_docs)
+                }
+                for fut in as_completed(futures):
+                    item = futures[fut]
+                    try:
+                        result = {"id": item["id"], **fut.result()}
+                    except Exception as exc:
+                        result = {"id": item["id"], "query": item["question"], "error": str(exc)}
+                    out.write(json.dumps(result) + "\n")
+                    out.flush()
+                    answered += 1
+                print(f"[OK] {answered}/{len(pending)} answered")
+    finally:
+        # Retried ids were appended after their old error lines; keep only the latest
+        compact_results(out_path)
+    print(f"[DONE] Results written to {out_path}")
+
 if __name__ == "__main__":
     argp = argparse.ArgumentParser(description="LangGraph test app for NetConfig retrieval.")
-    argp.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="FAISS index directory")
+    argp.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="Vector index directory")
+    argp.add_argument("--vector-backend", choices=VECTOR_BACKENDS, default="faiss", help="Index format in --index-dir (numpy: exact search)")
     argp.add_argument("--k", type=int, default=DEFAULT_K, help="Number of docs to retrieve")
+    argp.add_argument("--questions", help="Batch mode: JSONL file of questions")
+    argp.add_argument("--out", help="Batch mode: JSONL output (resumes if it exists)")
+    argp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Questions per embedding/search batch")
+    argp.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Concurrent reasoning calls")
+    argp.add_argument("--embedding-model", default=None, help="Embedding model name")
+    argp.add_argument("--context-tokens", type=int, default=DEFAULT_CONTEXT_TOKENS, help="Token budget for packed context (0 = join all docs)")
+    argp.add_argument("--neighbors", type=int, default=0, help="Adjacent chunks of the same stanza to pull in per hit")
+    argp.add_argument("--device", help="Only retrieve chunks of this device")
+    argp.add_argument("--tokenizer-model", default=None, help="Model name for token counting (default cl100k_base)")
+    argp.add_argument("--expand-refs", metavar="CHUNKS_DIR", help="Add referenced route-maps/prefix-lists/ACLs/VRFs from the xref index in CHUNKS_DIR")
+    argp.add_argument("--expand-depth", type=int, default=None, help="Max reference hops for --expand-refs (default: full closure)")
     args = argp.parse_args()
+    packer = make_packer(args.index_dir, args.context_tokens, args.neighbors, args.tokenizer_model, args.vector_backend)
+    expand = make_ref_expander(args.expand_refs, args.expand_depth) if args.expand_refs else None
+
+    if args.questions:
+        if not args.out:
+            raise SystemExit("--out is required with --questions")
+        run_batch(args.index_dir, args.k, args.questions, args.out, args.batch_size, args.concurrency, args.embedding_model, packer, args.device, expand, args.vector_backend)
+        raise SystemExit(0)
 
-    app = build_graph(args.index_dir, args.k)
+    app = build_graph(args.index_dir, args.k, packer, args.device, expand, args.vector_backend)
     while True:
         q = input("Ask: ")
         if q == "exit":
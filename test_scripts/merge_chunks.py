@@ -1,7 +1,10 @@
 import os
+import sys
 import json
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 DEFAULT_CHUNK_DIR = "config_chunks"
 DEFAULT_OUT_DIR = "merged_config"
@@ -21,11 +24,87 @@ def order_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return sorted(chunks, key=lambda c: c["metadata"]["chunk_index"])
     return chunks
 
-def merge_chunks(chunks: List[Dict[str, Any]], separator: str) -> str:
+def has_spans(chunks: List[Dict[str, Any]]) -> bool:
+    return bool(chunks) and all("byte_start" in c.get("metadata", {}) for c in chunks)
+
+def merge_chunks(chunks: List[Dict[str, Any]], separator: str, spans: bool = False) -> str:
+    """Join chunks in order. With `spans`, split pieces whose source spans
+    overlap are stitched with the splitter overlap removed instead of being
+    repeated."""
     ordered = order_chunks(chunks)
-    parts = [c.get("content", "").rstrip() for c in ordered]
-    merged = separator.join(parts).rstrip() + "\n"
-    return merged
+    if not (spans and has_spans(ordered)):
+        parts = [c.get("content", "").rstrip() for c in ordered]
+        return separator.join(parts).rstrip() + "\n"
+
+    from netconfig.utils.context_pack import merge_overlap
+    parts, prev_end = [], None
+    for c in sorted(ordered, key=lambda c: c["metadata"]["byte_start"]):
+        meta = c["metadata"]
+        content = c.get("content", "").rstrip()
+        if parts and meta["byte_start"] < prev_end:
+            parts[-1] = merge_overlap(parts[-1], content, prev_end - meta["byte_start"])
+        else:
+            parts.append(content)
+        prev_end = max(prev_end or 0, meta["byte_end"])
+    return separator.join(parts).rstrip() + "\n"
+
+def rebuild_span(source, chunk) -> bytes:
+    """A chunk's source span rebuilt from its `content`: every line the parser
+    kept comes from the content (with the source line ending), only dropped
+    lines (blank, comments, ignored) come from the source. Content lines left
+    over are appended, so any difference shows in the bytes."""
+    text = source.view(chunk).text
+    lines = iter(chunk.content.splitlines())
+    out = []
+    for line in text.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        ending = line[len(body):]
+        out.append((next(lines, "") if source.keeps_line(body) else body) + ending)
+    out.extend("\n" + line for line in lines)
+    return "".join(out).encode("utf-8", "surrogateescape")
+
+def rebuild_from_source(chunks: List[Dict[str, Any]], source_path: str, os_type: Optional[str] = None):
+    """Rebuild a config from its chunks and check it against the source.
+    Spanned regions are rebuilt from chunk content (rebuild_span); the mmap'd
+    source only fills gaps between spans (comments, `end`, blank lines).
+    Returns (bytes, stats): stats reports span coverage, whether the rebuild
+    equals the source byte for byte (`exact`) and any chunk whose content no
+    longer matches its source span."""
+    from netconfig.core.chunk_record import records_from_dicts
+    from netconfig.core.chunk_view import SourceFile
+
+    records = sorted(records_from_dicts(chunks), key=lambda c: c.byte_start)
+    os_type = os_type or next((c.os_type for c in records if c.os_type), None)
+    out = bytearray()
+    covered = pos = 0
+    mismatched = []
+    with SourceFile(source_path, os_type) as source:
+        for chunk in records:
+            rebuilt = rebuild_span(source, chunk)
+            with source.raw(chunk.byte_start, chunk.byte_end) as span:
+                if rebuilt != span:
+                    mismatched.append(chunk.chunk_id or chunk.section)
+            if chunk.byte_start > pos:
+                with source.raw(pos, chunk.byte_start) as gap:
+                    out += gap
+            if chunk.byte_end > pos:
+                # Split pieces overlap the previous chunk; keep only the new bytes
+                out += rebuilt[max(pos - chunk.byte_start, 0):]
+                covered += chunk.byte_end - max(pos, chunk.byte_start)
+                pos = chunk.byte_end
+        with source.raw(pos, len(source)) as tail:
+            out += tail
+        with source.raw(0, len(source)) as whole:
+            exact = out == whole
+        total = len(source)
+    stats = {
+        "bytes": total,
+        "covered": covered,
+        "coverage_pct": round(100.0 * covered / total, 1) if total else 0.0,
+        "exact": exact,
+        "mismatched": mismatched,
+    }
+    return bytes(out), stats
 
 def device_name_from_file(path: str) -> str:
     base = os.path.basename(path)
@@ -33,16 +112,42 @@ def device_name_from_file(path: str) -> str:
         base = base[:-5]
     return base
 
-def write_config(out_path: str, content: str):
-    os.makedirs(os.path.dirname(out_path), exist_ok=True)
-    with open(out_path, "w") as f:
+def write_config(out_path: str, content):
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(out_path, mode) as f:
         f.write(content)
 
-def process_file(path: str, out_dir: str, out_path: str, separator: str):
+def find_source(source_dir: str, device: str) -> Optional[str]:
+    for ext in (".cfg", ".conf", ".txt", ""):
+        path = os.path.join(source_dir, device + ext)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def process_file(path: str, out_dir: str, out_path: str, separator: str, spans: bool = False,
+                 source_dir: Optional[str] = None):
     chunks = load_chunks(path)
-    merged = merge_chunks(chunks, separator)
     device = device_name_from_file(path)
     target = out_path or os.path.join(out_dir, f"{device}.cfg")
+    if source_dir:
+        source = find_source(source_dir, device)
+        if not source:
+            print(f"[WARN] {device}: no source config in {source_dir}, skipped")
+            return
+        if not has_spans(chunks):
+            print(f"[WARN] {device}: chunks have no byte spans (rebuild chunks), skipped")
+            return
+        merged, stats = rebuild_from_source(chunks, source)
+        write_config(target, merged)
+        status = "OK" if stats["exact"] and not stats["mismatched"] else "WARN"
+        print(
+            f"[{status}] {device}: config written to {target} "
+            f"(coverage={stats['coverage_pct']}% of {stats['bytes']} bytes, exact={stats['exact']}, "
+            f"mismatched={len(stats['mismatched'])})"
+        )
+        return
+    merged = merge_chunks(chunks, separator, spans)
     write_config(target, merged)
     print(f"[OK] {device}: config written to {target}")
 
@@ -54,12 +159,14 @@ def main():
     argp.add_argument("--out", help="Output file path (only for --chunks)")
     argp.add_argument("--separator", default="\n!\n", help="Separator between chunks")
     argp.add_argument("--no-separator", action="store_true", help="Do not add separators between chunks")
+    argp.add_argument("--spans", action="store_true", help="Use chunk source spans to drop split overlap")
+    argp.add_argument("--source-dir", help="Rebuild byte-exact from source configs using chunk spans")
     args = argp.parse_args()
 
     separator = "\n" if args.no_separator else args.separator
 
     if args.chunks:
-        process_file(args.chunks, args.out_dir, args.out, separator)
+        process_file(args.chunks, args.out_dir, args.out, separator, args.spans, args.source_dir)
         return
 
     files = sorted([f for f in os.listdir(args.chunks_dir) if f.endswith(".json")])
@@ -67,7 +174,7 @@ def main():
         raise SystemExit(f"No .json chunk files found in {args.chunks_dir}")
 
     for file in files:
-        process_file(os.path.join(args.chunks_dir, file), args.out_dir, None, separator)
+        process_file(os.path.join(args.chunks_dir, file), args.out_dir, None, separator, args.spans, args.source_dir)
 
 if __name__ == "__main__":
     main()
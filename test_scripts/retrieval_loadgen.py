@@ -0,0 +1,142 @@
+"""Load generator for retrieval_service.py (throughput + latency percentiles).
+
+By default it starts the service in-process with stub embeddings, so no
+index or API key is needed. Use --host/--port or --unix to hit a running one.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from retrieval_service import (
+    DEFAULT_CHUNK_DIR,
+    DEFAULT_HOST,
+    DEFAULT_MAX_BATCH,
+    DEFAULT_MAX_WAIT_MS,
+    RetrievalService,
+    load_index,
+    percentile,
+)
+
+DEFAULT_QUESTIONS = [
+    "Which interfaces have no shutdown and an IPv4 address?",
+    "Show BGP neighbors and their remote AS",
+    "What NTP servers are configured?",
+    "Which ACL is applied to the management interface?",
+    "List route-maps used for BGP inbound policy",
+    "What SNMP communities exist?",
+    "Which VRFs are defined?",
+    "How are the vty lines secured?",
+    "What logging hosts are configured?",
+    "Show the QoS policy-map configuration",
+]
+
+async def open_conn(host, port, unix_path):
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+async def request(reader, writer, method, path, payload=None, close=False):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    connection = "close" if close else "keep-alive"
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: netconfig\r\nContent-Type: application/json\r\n"
+        f"Connection: {connection}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    status = (await reader.readline()).decode("latin-1").split(" ", 2)[1]
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    data = await reader.readexactly(length)
+    return status, json.loads(data)
+
+async def client(host, port, unix_path, questions, counter, total, k, latencies, errors):
+    reader, writer = await open_conn(host, port, unix_path)
+    try:
+        while counter[0] < total:
+            counter[0] += 1
+            started = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/query", {"question": random.choice(questions), "k": k})
+            if status != "200":
+                errors[0] += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        await request(reader, writer, "GET", "/health", close=True)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def run_load(args):
+    server = None
+    host, port, unix_path = args.host, args.port, args.unix
+    if not (args.port or args.unix):
+        index = load_index(None, stub=True, chunks_dir=args.chunks_dir, stub_latency_ms=args.stub_latency_ms)
+        service = RetrievalService(index, k=args.k, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        server = await service.start(DEFAULT_HOST, 0)
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"[INFO] Started stub service on {host}:{port} (stub_latency_ms={args.stub_latency_ms})")
+
+    questions = DEFAULT_QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    latencies, errors, counter = [], [0], [0]
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, unix_path, questions, counter, args.requests, args.k, latencies, errors)
+        for _ in range(args.concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+
+    reader, writer = await open_conn(host, port, unix_path)
+    _, metrics = await request(reader, writer, "GET", "/metrics", close=True)
+    writer.close()
+    await writer.wait_closed()
+    if server:
+        server.close()
+        await server.wait_closed()
+
+    report = {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_qps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+        },
+        "server": metrics,
+    }
+    print(json.dumps(report, indent=2))
+
+def main():
+    argp = argparse.ArgumentParser(description="Load generator for the NetConfig retrieval service.")
+    argp.add_argument("--host", default=DEFAULT_HOST, help="Service host (with --port)")
+    argp.add_argument("--port", type=int, default=None, help="Target a running service on this port")
+    argp.add_argument("--unix", help="Target a running service on this Unix socket")
+    argp.add_argument("--concurrency", type=int, default=32, help="Concurrent client connections")
+    argp.add_argument("--requests", type=int, default=2000, help="Total requests to send")
+    argp.add_argument("--k", type=int, default=8, help="Docs per query")
+    argp.add_argument("--questions", help="Text file with one question per line")
+    argp.add_argument("--chunks-dir", default=DEFAULT_CHUNK_DIR, help="Chunks for the in-process stub service")
+    argp.add_argument("--stub-latency-ms", type=float, default=20.0, help="Simulated per-call embedding latency")
+    argp.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="In-process service max batch")
+    argp.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="In-process service batch wait")
+    args = argp.parse_args()
+    asyncio.run(run_load(args))
+
+if __name__ == "__main__":
+    main()
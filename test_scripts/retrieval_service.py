@@ -0,0 +1,269 @@
+"""Long-running local retrieval service over the FAISS index.
+
+Concurrent queries are micro-batched: one embedding call and one matrix
+search per batch. Speaks a minimal HTTP/1.1 JSON protocol over TCP or a
+Unix socket:
+
+  POST /query   {"question": "...", "k": 8, "device": "optional"}
+  GET  /metrics
+  GET  /health
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from netconfig.utils.vector_index import VECTOR_BACKENDS
+
+DEFAULT_INDEX_DIR = "index/faiss"
+DEFAULT_CHUNK_DIR = "config_chunks"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_K = 8
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+STATS_WINDOW = 10000
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+class LatencyStats:
+    def __init__(self, window: int = STATS_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.queue_waits = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched = 0
+        self.started = time.time()
+
+    def record_batch(self, size: int):
+        self.batches += 1
+        self.batched += size
+
+    def record(self, latency_ms: float, queue_ms: float):
+        self.requests += 1
+        self.latencies.append(latency_ms)
+        self.queue_waits.append(queue_ms)
+
+    def snapshot(self):
+        lat = list(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched / self.batches, 2) if self.batches else 0.0,
+            "uptime_s": round(time.time() - self.started, 1),
+            "latency_ms": {
+                "p50": round(percentile(lat, 50), 2),
+                "p95": round(percentile(lat, 95), 2),
+                "p99": round(percentile(lat, 99), 2),
+                "max": round(max(lat), 2) if lat else 0.0,
+            },
+            "queue_ms_p99": round(percentile(list(self.queue_waits), 99), 2),
+        }
+
+class MicroBatcher:
+    """Collects queued queries for up to `max_wait_ms` (or `max_batch` items)
+    and answers them with a single embed + search call."""
+
+    def __init__(self, index, k: int, max_batch: int, max_wait_ms: float, stats: LatencyStats, refs=None):
+        self.index = index
+        self.refs = refs
+        self.k = k
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.stats = stats
+        self.queue = asyncio.Queue()
+
+    async def submit(self, question: str, k: int, device: str = None):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((question, k, device, fut, time.perf_counter()))
+        return await fut
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _search(self, questions, k, devices):
+        from netconfig.core.dedup import search_scoped
+        # Device-scoped or deduped queries short of k hits are searched again with a larger pool
+        return search_scoped(self.index, self.index.embed_queries(questions), k, self.refs, devices)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            started = time.perf_counter()
+            self.stats.record_batch(len(batch))
+            try:
+                k = max(item[1] for item in batch)
+                results = await loop.run_in_executor(
+                    None, self._search, [item[0] for item in batch], k, [item[2] for item in batch]
+                )
+            except Exception as exc:
+                for _, _, _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            for (_, item_k, _, fut, enqueued), hits in zip(batch, results):
+                if not fut.done():
+                    fut.set_result((hits[:item_k], (started - enqueued) * 1000.0, len(batch)))
+
+class RetrievalService:
+    def __init__(self, index, k: int = DEFAULT_K, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 refs=None):
+        self.k = k
+        self.refs = refs
+        self.stats = LatencyStats()
+        self.batcher = MicroBatcher(index, k, max_batch, max_wait_ms, self.stats, refs)
+        self._worker = None
+
+    async def query(self, question: str, k: int = None, device: str = None):
+        started = time.perf_counter()
+        k = k or self.k
+        hits, queue_ms, batch_size = await self.batcher.submit(question, k, device)
+        latency_ms = (time.perf_counter() - started) * 1000.0
+        self.stats.record(latency_ms, queue_ms)
+        return {
+            "question": question,
+            "results": [
+                {"content": doc.page_content, "metadata": doc.metadata, "score": score}
+                for doc, score in hits
+            ],
+            "latency_ms": round(latency_ms, 3),
+            "queue_ms": round(queue_ms, 3),
+            "batch_size": batch_size,
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        if method == "GET" and path == "/health":
+            return "200 OK", {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return "200 OK", self.stats.snapshot()
+        if method == "POST" and path == "/query":
+            try:
+                payload = json.loads(body or b"{}")
+                question = payload["question"]
+            except (ValueError, KeyError, TypeError):
+                self.stats.errors += 1
+                return "400 Bad Request", {"error": "expected JSON body with 'question'"}
+            k = payload.get("k")
+            if k is not None and (isinstance(k, bool) or not isinstance(k, int) or k <= 0):
+                self.stats.errors += 1
+                return "400 Bad Request", {"error": "'k' must be a positive integer"}
+            try:
+                return "200 OK", await self.query(question, k, payload.get("device"))
+            except Exception as exc:
+                self.stats.errors += 1
+                return "500 Internal Server Error", {"error": str(exc)}
+        return "404 Not Found", {"error": f"no route for {method} {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length") or 0))
+                status, payload = await self.dispatch(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, unix_path: str = None):
+        self._worker = asyncio.ensure_future(self.batcher.run())
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            return await asyncio.start_unix_server(self.handle, path=unix_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+def load_index(index_dir: str, embedding_model: str = None, stub: bool = False,
+               chunks_dir: str = DEFAULT_CHUNK_DIR, stub_latency_ms: float = 0.0, backend: str = "faiss"):
+    from netconfig.utils.vector_index import get_index_class
+    index_cls = get_index_class(backend)
+    if not stub:
+        return index_cls.load(index_dir, embedding_model)
+
+    from netconfig.netconfig_runner import collect_chunk_files, load_records
+    from netconfig.utils.embeddings import HashEmbeddings, Document
+
+    docs = []
+    for path in collect_chunk_files(chunks_dir):
+        for c in load_records(path):
+            docs.append(Document(page_content=c.content, metadata=c.metadata()))
+    embedder = HashEmbeddings(latency_ms=stub_latency_ms)
+    return index_cls.from_documents(docs, embedder=embedder)
+
+async def serve(args):
+    from netconfig.core.dedup import load_refs
+    index = load_index(args.index_dir, args.embedding_model, args.stub, args.chunks_dir, args.stub_latency_ms, args.vector_backend)
+    refs = None if args.stub else load_refs(args.index_dir)
+    service = RetrievalService(index, k=args.k, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms, refs=refs)
+    server = await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"[INFO] Retrieval service listening on {where} (max_batch={args.max_batch}, max_wait_ms={args.max_wait_ms})")
+    async with server:
+        await server.serve_forever()
+
+def main():
+    argp = argparse.ArgumentParser(description="Local micro-batching retrieval service for NetConfig.")
+    argp.add_argument("--index-dir", default=DEFAULT_INDEX_DIR, help="Vector index directory")
+    argp.add_argument("--vector-backend", choices=VECTOR_BACKENDS, default="faiss", help="Index format in --index-dir (numpy: exact search)")
+    argp.add_argument("--embedding-model", default=None, help="Embedding model name")
+    argp.add_argument("--k", type=int, default=DEFAULT_K, help="Default number of docs per query")
+    argp.add_argument("--host", default=DEFAULT_HOST, help="Bind address")
+    argp.add_argument("--port", type=int, default=DEFAULT_PORT, help="Bind port")
+    argp.add_argument("--unix", help="Serve on a Unix socket path instead of TCP")
+    argp.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="Max queries per embedding/search batch")
+    argp.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS, help="Max time to wait for a batch to fill")
+    argp.add_argument("--stub", action="store_true", help="Build an in-memory index from chunks with stub embeddings")
+    argp.add_argument("--chunks-dir", default=DEFAULT_CHUNK_DIR, help="Chunks directory (only with --stub)")
+    argp.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated per-call embedding latency (only with --stub)")
+    args = argp.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
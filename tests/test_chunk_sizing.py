@@ -0,0 +1,46 @@
+import argparse
+
+from netconfig import netconfig_runner as runner
+from netconfig.core.chunk_builder import build_chunks
+from netconfig.core.chunk_sizing import CharSizing, TokenSizing, chunk_sizes, chunk_targets, size_report
+from netconfig.parsers import get_parser
+
+def sizing_args(**overrides):
+    values = dict(hierarchical=False, token_chunking=True, chunk_tokens=None,
+                  chunk_overlap_tokens=None, embedding_model=None)
+    values.update(overrides)
+    return argparse.Namespace(**values)
+
+def test_fill_is_measured_against_each_os_budget():
+    sizing = TokenSizing(max_tokens=512, os_max_tokens={"iosxe": 120})
+    chunks = [
+        build_chunks("R1", "ios", "hostname R1\n")[0],
+        build_chunks("E1", "eos", "hostname E1\n")[0],
+    ]
+    targets = chunk_targets(chunks, sizing)
+    assert targets == [120, 512]
+
+    report = size_report([117, 117], sizing, targets)
+    assert report["targets"] == [120, 512]
+    assert report["buckets"]["75-100%"] == 1
+    assert report["buckets"]["<25%"] == 1
+    assert report["mean_fill"] == round(234 / 632, 3)
+
+def test_char_mode_reports_against_char_budget():
+    with open("configs/IOS-PROD-EDGE-01.cfg") as f:
+        chunks = build_chunks("IOS-PROD-EDGE-01", "ios", f.read())
+    sizing = CharSizing()
+    report = size_report(chunk_sizes(chunks, sizing), sizing, chunk_targets(chunks, sizing))
+    assert report["unit"] == "chars"
+    assert report["targets"] == [sizing.max_len]
+    assert report["max"] == max(len(c.content) for c in chunks)
+
+def test_cli_chunk_tokens_wins_over_os_max_tokens():
+    chunk_cfg = {"os_max_tokens": {"ios": 120}}
+    ios = get_parser("ios")
+
+    sizing = runner.build_sizing(sizing_args(chunk_tokens=200), chunk_cfg)
+    assert sizing.for_parser(ios).max_len == 200
+
+    sizing = runner.build_sizing(sizing_args(), chunk_cfg)
+    assert sizing.for_parser(ios).max_len == 120
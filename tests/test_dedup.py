@@ -0,0 +1,35 @@
+import argparse
+import shutil
+
+import pytest
+
+from netconfig import netconfig_runner as runner
+from netconfig.core.dedup import load_refs, search_resolved
+from netconfig.utils import numpy_index
+from netconfig.utils.embeddings import HashEmbeddings
+from netconfig.utils.numpy_index import NumpyIndex
+
+@pytest.fixture
+def chunks_dir(tmp_path):
+    path = tmp_path / "chunks"
+    shutil.copytree("config_chunks", path)
+    return str(path)
+
+def build_args(faiss_dir, dedup):
+    return argparse.Namespace(vector_backend="numpy", faiss_dir=faiss_dir, dedup=dedup, embedding_model=None)
+
+def test_plain_build_over_dedup_index_drops_refs(tmp_path, chunks_dir, monkeypatch):
+    monkeypatch.setattr(numpy_index, "make_embedder", lambda model=None: HashEmbeddings())
+    faiss_dir = str(tmp_path / "index")
+
+    runner.run_faiss(build_args(faiss_dir, dedup=True), chunks_dir)
+    assert load_refs(faiss_dir) is not None
+
+    runner.run_faiss(build_args(faiss_dir, dedup=False), chunks_dir)
+    assert load_refs(faiss_dir) is None
+
+    index = NumpyIndex.load(faiss_dir, embedder=HashEmbeddings())
+    docs = search_resolved(index, load_refs(faiss_dir), "policy-map QOS-CUST", k=8)
+    ids = [d.metadata["chunk_id"] for d in docs]
+    assert len(ids) == len(set(ids)) == 8
+    assert all("devices" not in d.metadata for d in docs)
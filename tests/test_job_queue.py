@@ -0,0 +1,27 @@
+import pytest
+
+from netconfig import netconfig_runner as runner
+from netconfig.utils.job_queue import JobQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.sqlite"))
+    yield queue
+    queue.close()
+
+def test_device_named_like_faiss_task_gets_its_own_task(queue, tmp_path):
+    config = tmp_path / "faiss-index.cfg"
+    config.write_text("hostname faiss-index\n")
+    assert queue.add("faiss-index", "device", str(config), "sig") == "new"
+    assert queue.add(runner.FAISS_TASK, "faiss") == "new"
+
+    assert queue.claim("w1", "device").name == "faiss-index"
+    assert queue.claim("w1", "faiss").name == runner.FAISS_TASK
+    with pytest.raises(ValueError):
+        queue.add("faiss-index", "faiss")
+
+def test_legacy_faiss_task_is_dropped(queue):
+    queue.add(runner.LEGACY_FAISS_TASK, "faiss")
+    assert not queue.remove(runner.LEGACY_FAISS_TASK, "device")
+    assert queue.remove(runner.LEGACY_FAISS_TASK, "faiss")
+    assert queue.names("faiss") == []
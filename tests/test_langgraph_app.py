@@ -0,0 +1,52 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("langchain")
+pytest.importorskip("langgraph")
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "test_scripts", "langgraph_app.py")
+spec = importlib.util.spec_from_file_location("langgraph_app", SCRIPT)
+langgraph_app = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(langgraph_app)
+
+class EmptyIndex:
+    def embed_queries(self, texts):
+        return [[0.0] for _ in texts]
+
+    def search_vectors(self, vectors, k=8, filter=None):
+        return [[] for _ in vectors]
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+def test_resume_after_error_keeps_one_entry_per_id(tmp_path, monkeypatch):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("".join(json.dumps({"id": i, "question": f"q{i}"}) + "\n" for i in (1, 2, 3)))
+    out = str(tmp_path / "results.jsonl")
+    failing = {"q2"}
+
+    def reason(llm, question, docs, packer=None):
+        if question in failing:
+            raise RuntimeError("rate limited")
+        return {"query": question, "found": True}
+
+    monkeypatch.setattr(langgraph_app, "load_index", lambda *args: EmptyIndex())
+    monkeypatch.setattr(langgraph_app, "ChatOpenAI", lambda **kwargs: None)
+    monkeypatch.setattr(langgraph_app, "reason", reason)
+
+    langgraph_app.run_batch(str(tmp_path), 4, str(questions), out)
+    assert {r["id"]: "error" in r for r in read_results(out)} == {1: False, 2: True, 3: False}
+
+    # Interrupted write: a torn trailing line is dropped on resume
+    with open(out, "a") as f:
+        f.write('{"id": 3, "que')
+    failing.clear()
+    langgraph_app.run_batch(str(tmp_path), 4, str(questions), out)
+
+    results = read_results(out)
+    assert sorted(r["id"] for r in results) == [1, 2, 3]
+    assert all(r.get("found") and "error" not in r for r in results)
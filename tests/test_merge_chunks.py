@@ -0,0 +1,56 @@
+import importlib.util
+import os
+
+import pytest
+
+from netconfig.core.chunk_builder import build_chunks
+from netconfig.core.chunk_record import records_to_dicts
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "test_scripts", "merge_chunks.py")
+spec = importlib.util.spec_from_file_location("merge_chunks", SCRIPT)
+merge_chunks = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(merge_chunks)
+
+def long_config() -> str:
+    lines = ["hostname R1", "!", "ip access-list extended BIG"]
+    lines += [f" {10 * i} permit tcp any host 10.0.{i}.1 eq 443" for i in range(1, 80)]
+    lines += ["!", "interface Gi0/1", " description uplink", " ! inline comment", "", " shutdown", "!", "end", ""]
+    return "\n".join(lines)
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "R1.cfg"
+    path.write_bytes(long_config().encode())
+    chunks = records_to_dicts(build_chunks("R1", "ios", long_config()))
+    return str(path), chunks
+
+def test_rebuild_from_chunk_content_is_exact(source):
+    path, chunks = source
+    starts = sorted(c["metadata"]["byte_start"] for c in chunks)
+    ends = sorted(c["metadata"]["byte_end"] for c in chunks)
+    # The ACL is split into overlapping pieces
+    assert any(start < end for start, end in zip(starts[1:], ends))
+
+    rebuilt, stats = merge_chunks.rebuild_from_source(chunks, path)
+    with open(path, "rb") as f:
+        assert rebuilt == f.read()
+    assert stats["exact"] and not stats["mismatched"]
+
+def test_rebuild_detects_broken_content(source):
+    path, chunks = source
+    broken = next(c for c in chunks if c["metadata"].get("section") == "interface Gi0/1")
+    broken["content"] = broken["content"].replace("shutdown", "no shutdown")
+
+    rebuilt, stats = merge_chunks.rebuild_from_source(chunks, path)
+    assert not stats["exact"]
+    assert stats["mismatched"] == [broken["metadata"]["chunk_id"]]
+    assert b" no shutdown" in rebuilt
+
+def test_rebuild_detects_broken_span(source):
+    path, chunks = source
+    broken = next(c for c in chunks if c["metadata"].get("section") == "interface Gi0/1")
+    broken["metadata"]["byte_start"] += 1
+
+    _, stats = merge_chunks.rebuild_from_source(chunks, path)
+    assert not stats["exact"]
+    assert broken["metadata"]["chunk_id"] in stats["mismatched"]